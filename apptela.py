@@ -8,6 +8,7 @@ from bot_engine import BotEngine
 from iq_service import IQService
 from strategy_analyzer import StrategyAnalyzer  # Novo import
 from settings_store import load_settings, save_settings
+from trade_journal import TradeJournal
 
 # ===================== WRAPPER PARA BOTENGINE =====================
 # ===================== WRAPPER PARA BOTENGINE =====================
@@ -65,6 +66,8 @@ class ProDashboardApp:
         self.trade_rows = {}
         # Stats por par (para não recalcular em loop)
         self.pair_stats = {}  # par -> dict(w,l,profit,trades)
+        # Diário durável: trades fechados sobrevivem ao restart (stats reconstruídas dele)
+        self.journal = TradeJournal()
 
         # Log buffer (UI)
         self._log_buf = []
@@ -111,6 +114,7 @@ class ProDashboardApp:
         self.mode_24h_var = tk.BooleanVar(value=True)  # NOVO: Modo 24h ativado por padrão
 
         self._build_ui()
+        self._load_journal_stats()
         self._load_saved_login()
         self._poll_queue()
 
@@ -503,7 +507,7 @@ class ProDashboardApp:
                 if ok:
                     # NOVO: Inicializar StrategyAnalyzer após conexão
                     self.event_queue.put({"type": "log", "message": "🧠 Inicializando IA de estratégias..."})
-                    analyzer = StrategyAnalyzer(service)
+                    analyzer = StrategyAnalyzer(service, journal=self.journal)
                     self.event_queue.put({"type": "log", "message": "✅ Conectado com sucesso! IA pronta."})
                 else:
                     self.event_queue.put({"type": "log", "message": "❌ Falha na conexão. Verifique suas credenciais."})
@@ -559,6 +563,11 @@ class ProDashboardApp:
         self.analyze_once_btn.config(state="disabled")
 
         self.bot_running = False
+        if self.service:
+            try:
+                self.service.close()
+            except Exception:
+                pass
         self.service = None
         self.analyzer = None
         self.connected = False
@@ -1095,6 +1104,13 @@ class ProDashboardApp:
             else:
                 st["l"] += 1
 
+            self.journal.record(
+                "apptela", par, tag,
+                strategy=ev.get("ind"), timeframe=ev.get("tf"), direction=ev.get("dir"),
+                profit=lucro_float, stake=ev.get("valor"), payout=ev.get("payout"),
+                order_id=ev.get("order_id"),
+            )
+
             # Atualiza assertividade geral (incremental)
             total = self.wins_losses_total()
             if tag == "WIN":
@@ -1111,6 +1127,23 @@ class ProDashboardApp:
             # Atualiza tabela de stats (sem varrer trades)
             self._refresh_stats_table()
 
+    def _load_journal_stats(self):
+        """Reconstrói pair_stats a partir do diário (uma agregação no SQLite)."""
+        try:
+            rows = self.journal.totals_by("asset", source="apptela")
+        except Exception as e:
+            self._append_log(f"⚠️ Diário de trades indisponível: {e}")
+            return
+        for par, w, l, _total, profit, _ts in rows:
+            self.pair_stats[par] = {"w": int(w), "l": int(l), "profit": float(profit or 0.0), "trades": int(w + l)}
+        if not self.pair_stats:
+            return
+
+        w, l, tot = self.wins_losses_total()
+        acc = (w / tot * 100.0) if tot else 0.0
+        self.acc_lbl.config(text=f"{acc:.0f}% ({w}/{tot})")
+        self._refresh_stats_table()
+
     def wins_losses_total(self):
         w = sum(v["w"] for v in self.pair_stats.values())
         l = sum(v["l"] for v in self.pair_stats.values())
@@ -1207,6 +1240,7 @@ class ProDashboardApp:
                 self.bot.stop()
         except Exception:
             pass
+        self.journal.close()
         self.root.destroy()
 
 
@@ -0,0 +1,91 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def is_otc(asset: str) -> bool:
+    return "otc" in (asset or "").lower()
+
+
+class AssetUniverse:
+    """
+    Universo de ativos pré-computado a partir do OpenMarketsSnapshot:
+    - Guarda o estado aberto/fechado de cada ativo por mercado.
+    - A cada refresh do snapshot recalcula as listas (OTC / não-OTC) uma vez só.
+    - Emite deltas on_change(adicionados, removidos) quando o conjunto muda.
+    Os loops leem assets() em vez de varrer o horário de mercados.
+    """
+
+    def __init__(self, markets, kinds=("turbo", "binary")):
+        self.markets = markets
+        self.kinds = tuple(kinds)
+        self._lock = threading.Lock()
+        self._state = {}
+        self._open = frozenset()
+        self._lists = {}
+        self._listeners = []
+        markets.add_listener(self._on_snapshot)
+        data = markets.current()
+        if data is not None:
+            self._on_snapshot(data)
+
+    def on_change(self, callback):
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def assets(self, include_otc=True, include_non_otc=True):
+        if not self._lists:
+            self.markets.get()  # primeira leitura: refresh síncrono, o listener preenche
+        return list(self._lists.get((bool(include_otc), bool(include_non_otc)), ()))
+
+    def state(self, asset):
+        """{mercado: aberto} do ativo no último snapshot."""
+        with self._lock:
+            return dict(self._state.get(asset, {}))
+
+    def is_open(self, asset):
+        if not self._lists:
+            self.markets.get()
+        return asset in self._open
+
+    # ------------------------------------------------------------------
+    def _on_snapshot(self, data):
+        raw = data.get("raw", {}) if data else {}
+        state = {}
+        for market, assets in raw.items():
+            if not isinstance(assets, dict):
+                continue
+            for asset, info in assets.items():
+                if isinstance(info, dict):
+                    state.setdefault(asset, {})[market] = bool(info.get("open", False))
+
+        opened = frozenset(
+            asset for asset, markets in state.items()
+            if any(markets.get(k) for k in self.kinds)
+        )
+        otc = sorted(a for a in opened if is_otc(a))
+        non_otc = sorted(a for a in opened if not is_otc(a))
+        lists = {
+            (True, True): sorted(opened),
+            (True, False): otc,
+            (False, True): non_otc,
+            (False, False): [],
+        }
+
+        with self._lock:
+            previous = self._open
+            self._state = state
+            self._open = opened
+            self._lists = lists
+
+        added = opened - previous
+        removed = previous - opened
+        if not (added or removed):
+            return
+        logger.debug(f"Universo de ativos: +{len(added)} -{len(removed)}")
+        for cb in list(self._listeners):
+            try:
+                cb(sorted(added), sorted(removed))
+            except Exception as e:
+                logger.error(f"Erro listener do universo: {e}")
@@ -1,11 +1,14 @@
 
 import threading
 import time
-import random
 import numpy as np
 from datetime import datetime
 
+from indicators import IndicatorEngine
 from ml_model import MLModel
+from ml_trainer import MLTrainer
+from model_registry import ModelRegistry
+from trade_executor import TradeExecutor
 
 
 class BotEngine:
@@ -26,6 +29,14 @@ class BotEngine:
         self.running = False
         self.sem = threading.Semaphore(int(self.cfg.get("max_concurrent", 2)))
 
+        # Execução limitada: pool fixo + fila de timers (sem thread por sinal)
+        self.executor = TradeExecutor(max_workers=int(self.cfg.get("executor_workers", 4)))
+        self._executor_down = False
+        self._pending_assets = set()
+        self._pending_lock = threading.Lock()
+        self.skipped_signals = 0
+        self.ml_rejected = 0
+
         # Estatísticas
         self.wins = 0
         self.losses = 0
@@ -51,10 +62,47 @@ class BotEngine:
 
         self.candle_count = int(self.cfg.get("candle_count", 90))
 
+        # Aquisição paralela (watchlist): pool limitado + timeout por ativo
+        self.fetch_concurrency = int(self.cfg.get("fetch_concurrency", 8))
+        self.fetch_timeout_sec = float(self.cfg.get("fetch_timeout_sec", 10))
+
+        # Agendamento por fechamento de candle: avalia last_seconds antes e envia no fechamento
+        self.eval_lead_sec = max(1.0, float(self.cfg.get("last_seconds", 3.0)))
+        self.send_margin_sec = float(self.cfg.get("send_margin_sec", 0.2))
+        self.last_cycle = {}
+        # custo médio (s) de buscar as velas de um ativo: limita quantos cabem na janela
+        self._fetch_cost = None
+
+        # EMA21/EMA50/ATR14 incrementais por (ativo, timeframe)
+        self.indicators = IndicatorEngine(ema_periods=(21, 50), atr_period=14)
+
         # ML
         self.use_ml = bool(self.cfg.get("use_ml", True))
         self.ml_threshold = float(self.cfg.get("ml_threshold", 0.58))
         self.ml = MLModel(seed=42, warmup=int(self.cfg.get("ml_warmup", 30)))
+        # Modelos especializados por ativo/cluster (LRU + disco), global como fallback
+        self.models = ModelRegistry(
+            self.ml,
+            key_mode=self.cfg.get("ml_key_mode", "cluster"),
+            max_models=int(self.cfg.get("ml_max_models", 20)),
+            models_dir=self.cfg.get("ml_models_dir", "ml_models"),
+            warmup=int(self.cfg.get("ml_warmup", 30)),
+        )
+        # Treino em background (replay + mini-lotes); inferência nunca espera
+        self.trainer = MLTrainer(
+            self.ml,
+            buffer_size=int(self.cfg.get("ml_buffer_size", 2000)),
+            batch_size=int(self.cfg.get("ml_batch_size", 32)),
+            fit_key=self.models.partial_fit,
+        )
+
+        # Checkpoint do ML: carrega no início (warm start) e salva periodicamente
+        self.ml_path = self.cfg.get("ml_path", "ml_model.npz")
+        self.ml_checkpoint_sec = float(self.cfg.get("ml_checkpoint_sec", 300))
+        self._ml_saved_seen = 0
+        if self.ml_path and self.ml.load(self.ml_path):
+            self._ml_saved_seen = self.ml._seen
+            self._log(f"🧠 ML carregado: {self.ml._seen} amostras (pronto={self.ml.ready()})")
 
         # Mercado preferido (espelha melhor na IQ)
         self.market_prefer = tuple(self.cfg.get("market_prefer", ("turbo", "binary", "digital")))
@@ -67,6 +115,11 @@ class BotEngine:
 
         self._last_trade_ts = {}
 
+        # Streaming de velas (assina a watchlist em vez de fazer polling)
+        self.stream_candles = bool(self.cfg.get("stream_candles", False))
+        # interrompe as esperas do loop no stop()
+        self._wake = threading.Event()
+
     # ------------------------------------------------------------------
     def _get_tf_sec(self, label):
         label = (label or "").lower()
@@ -114,19 +167,6 @@ class BotEngine:
             ema.append((v - ema[-1]) * alpha + ema[-1])
         return np.asarray(ema, dtype=float)
 
-    @staticmethod
-    def _atr(highs, lows, closes, period=14):
-        if len(closes) < period + 2:
-            return None
-        highs = np.asarray(highs, dtype=float)
-        lows = np.asarray(lows, dtype=float)
-        closes = np.asarray(closes, dtype=float)
-        prev_close = closes[:-1]
-        tr = np.maximum(highs[1:] - lows[1:],
-                        np.maximum(np.abs(highs[1:] - prev_close),
-                                   np.abs(lows[1:] - prev_close)))
-        return float(np.mean(tr[-period:]))
-
     def _get_candles(self, asset):
         try:
             return self.iq.get_candles(asset, self.interval_sec, self.candle_count) or []
@@ -143,67 +183,151 @@ class BotEngine:
             closes.append(float(c.get("close", 0.0)))
         return opens, highs, lows, closes
 
-    # ------------------------------------------------------------------
-    def _fast_confidence(self, asset, payout, closes, atr_val):
+    @staticmethod
+    def _stack_ohlc(candle_lists, length):
         """
-        Score rápido (0..100) para ranquear ativos.
+        Empilha as velas de vários ativos em matrizes (ativos x length).
+        Séries mais curtas são completadas à esquerda com o primeiro valor,
+        o que não altera a EMA (semeada no primeiro close) nem o ATR das últimas velas.
         """
-        if payout is None:
-            return 0.0
-
-        score = float(payout)
+        n = len(candle_lists)
+        highs = np.empty((n, length), dtype=float)
+        lows = np.empty((n, length), dtype=float)
+        closes = np.empty((n, length), dtype=float)
+        for i, candles in enumerate(candle_lists):
+            candles = candles[-length:]
+            k = len(candles)
+            try:
+                c = np.fromiter((x["close"] for x in candles), dtype=float, count=k)
+                h = np.fromiter((x["max"] for x in candles), dtype=float, count=k)
+                lo = np.fromiter((x["min"] for x in candles), dtype=float, count=k)
+            except (KeyError, TypeError):
+                _, h, lo, c = BotEngine._extract_ohlc(candles)
+            closes[i, length - k:] = c
+            highs[i, length - k:] = h
+            lows[i, length - k:] = lo
+            if k < length:
+                closes[i, :length - k] = closes[i, length - k]
+                highs[i, :length - k] = highs[i, length - k]
+                lows[i, :length - k] = lows[i, length - k]
+        return highs, lows, closes
 
-        ema21 = self._ema(closes, 21)
-        ema50 = self._ema(closes, 50)
-        if ema21 is None or ema50 is None:
-            return 0.0
-
-        if ema21[-1] > ema50[-1] or ema21[-1] < ema50[-1]:
-            score += 6.0
-
-        if atr_val is not None and len(closes) > 0:
-            p = max(1e-9, abs(closes[-1]))
-            atr_pct = (atr_val / p) * 100.0
-            if atr_pct >= 0.02:
-                score += 6.0
-            elif atr_pct >= 0.01:
-                score += 3.0
-            else:
-                score -= 10.0
+    @staticmethod
+    def _ema_last_batch(closes, period: int):
+        """
+        Último valor da EMA de cada linha numa única multiplicação matriz-vetor:
+        ema[-1] = (1-a)^(n-1)*x0 + sum(a*(1-a)^(n-1-k)*xk), k=1..n-1
+        """
+        n = closes.shape[1]
+        alpha = 2.0 / (period + 1.0)
+        w = alpha * (1.0 - alpha) ** np.arange(n - 1, -1, -1, dtype=float)
+        w[0] = (1.0 - alpha) ** (n - 1)
+        return closes @ w
 
-        return max(0.0, min(100.0, score))
+    @staticmethod
+    def _atr_last_batch(highs, lows, closes, period=14):
+        prev_close = closes[:, :-1]
+        tr = np.maximum(highs[:, 1:] - lows[:, 1:],
+                        np.maximum(np.abs(highs[:, 1:] - prev_close),
+                                   np.abs(lows[:, 1:] - prev_close)))
+        return tr[:, -period:].mean(axis=1)
+
+    def _score_batch(self, payouts, highs, lows, closes):
+        """Score rápido (0..100) para ranquear ativos, vetorizado para todos os ativos."""
+        ema21 = self._ema_last_batch(closes, 21)
+        ema50 = self._ema_last_batch(closes, 50)
+
+        atr = self._atr_last_batch(highs, lows, closes, 14)
+        atr_pct = atr / np.maximum(1e-9, np.abs(closes[:, -1])) * 100.0
+
+        score = np.asarray(payouts, dtype=float)
+        score = score + np.where(ema21 != ema50, 6.0, 0.0)
+        score = score + np.where(atr_pct >= 0.02, 6.0, np.where(atr_pct >= 0.01, 3.0, -10.0))
+        return np.clip(score, 0.0, 100.0)
+
+    def _features_batch(self, candle_lists, payouts, directions):
+        """
+        Features do ML (n, 7) para todos os candidatos do ciclo de uma vez.
+        Orientadas pela direção (+1 call / -1 put): um único modelo serve os dois lados.
+        """
+        length = max(len(c) for c in candle_lists)
+        highs, lows, closes = self._stack_ohlc(candle_lists, length)
+        d = np.asarray(directions, dtype=float)
+
+        c0, c1, c2 = closes[:, -1], closes[:, -2], closes[:, -3]
+        pct = 100.0 / np.maximum(1e-9, np.abs(c0))
+        ema21 = self._ema_last_batch(closes, 21)
+        ema50 = self._ema_last_batch(closes, 50)
+        atr = self._atr_last_batch(highs, lows, closes, 14)
+
+        return np.column_stack([
+            d,
+            (ema21 - ema50) * pct * d,
+            (c0 - ema21) * pct * d,
+            atr * pct,
+            (c0 - c1) * pct * d,
+            (c1 - c2) * pct * d,
+            np.asarray(payouts, dtype=float) / 100.0,
+        ])
 
+    # ------------------------------------------------------------------
     def _refresh_watchlist(self, assets):
         now = time.time()
         if self._watchlist and (now - self._watchlist_ts) < self.watchlist_refresh_sec:
             return self._watchlist
 
-        ranked = []
+        eligible = {}
         for asset in assets:
             try:
                 payout = self.iq.get_payout_percent(asset)
                 if payout is None or payout < self.min_payout:
                     continue
-
-                candles = self._get_candles(asset)
-                if len(candles) < 60:
-                    continue
-
-                _, highs, lows, closes = self._extract_ohlc(candles)
-                atr_val = self._atr(highs, lows, closes, 14)
-
-                score = self._fast_confidence(asset, payout, closes, atr_val)
-                if score < (self._required_confidence() - 2):
-                    continue
-
-                ranked.append((score, asset))
+                eligible[asset] = float(payout)
             except Exception:
                 continue
 
-        ranked.sort(reverse=True, key=lambda x: x[0])
-        self._watchlist = [a for _, a in ranked[:self.watchlist_size]]
+        t_fetch = time.time()
+        fetched = self.iq.fetch_candles_many(
+            list(eligible), self.interval_sec, self.candle_count,
+            max_workers=self.fetch_concurrency, timeout_sec=self.fetch_timeout_sec,
+        ) if eligible else {}
+        if eligible:
+            self._record_fetch_cost(max(1, len(fetched)), time.time() - t_fetch)
+
+        names, payouts, candle_lists = [], [], []
+        for asset, payout in eligible.items():
+            candles = fetched.get(asset) or []
+            if len(candles) < 60:
+                continue
+            names.append(asset)
+            payouts.append(payout)
+            candle_lists.append(candles)
+
+        watch = []
+        if names:
+            length = max(len(c) for c in candle_lists)
+            highs, lows, closes = self._stack_ohlc(candle_lists, length)
+            scores = self._score_batch(payouts, highs, lows, closes)
+
+            keep = np.flatnonzero(scores >= (self._required_confidence() - 2))
+            if self.watchlist_size <= 0:
+                keep = keep[:0]
+            elif keep.size > self.watchlist_size:
+                top = np.argpartition(-scores[keep], self.watchlist_size - 1)[:self.watchlist_size]
+                keep = keep[top]
+            keep = keep[np.argsort(-scores[keep], kind="stable")]
+            watch = [names[i] for i in keep]
+
+        self._watchlist = watch
         self._watchlist_ts = now
 
+        if self.stream_candles:
+            self.iq.stream_assets(self._watchlist, self.interval_sec)
+
+        m = self.metrics()
+        self._log(f"⚙️ Executor: trades={m['open_trades']} agendados={m['scheduled']} fila={m['queued']} "
+                  f"espera média={m['avg_wait_ms']:.0f}ms atraso timer={m['avg_late_ms']:.0f}ms")
+
         if self._watchlist:
             self._log(f"👀 Watchlist TOP {len(self._watchlist)}: {', '.join(self._watchlist[:8])}" +
                       (" ..." if len(self._watchlist) > 8 else ""))
@@ -222,90 +346,290 @@ class BotEngine:
                 req = 0.0
         return max(req, float(self.min_confidence_ui or 0.0))
 
-    def _wait_next_candle(self):
+    def _next_candle_ts(self):
+        """Próximo fechamento em hora do servidor (relógio sincronizado do IQService)."""
+        clock = getattr(self.iq, "clock", None)
+        if clock is not None:
+            return clock.next_boundary(self.interval_sec)
         now = time.time()
         interval = max(1, int(self.interval_sec))
-        next_ts = (int(now // interval) + 1) * interval
-        time.sleep(max(0.0, next_ts - now))
+        return (int(now // interval) + 1) * interval
+
+    def _local_ts(self, server_ts, early=False):
+        """
+        Converte um instante do servidor para o relógio local.
+        early=True antecipa pela latência de ida medida (para o envio da ordem).
+        """
+        clock = getattr(self.iq, "clock", None)
+        if clock is None:
+            return server_ts
+        ts = clock.to_local(server_ts)
+        return ts - clock.one_way() if early else ts
+
+    def _record_fetch_cost(self, n, seconds):
+        if seconds <= 0:
+            return
+        cost = seconds / n
+        self._fetch_cost = cost if self._fetch_cost is None else self._fetch_cost + (cost - self._fetch_cost) * 0.3
+
+    def _window_capacity(self, window_sec):
+        """Quantos ativos da watchlist dá para buscar e avaliar na janela (None = sem medida)."""
+        if not self._fetch_cost:
+            return None
+        return max(1, int(window_sec * 0.8 / self._fetch_cost))
+
+    def _reserve_slot(self, asset):
+        """Um trade aberto por ativo e no máximo max_concurrent no total."""
+        with self._pending_lock:
+            if asset in self._pending_assets:
+                return False
+            if not self.sem.acquire(blocking=False):
+                self.skipped_signals += 1
+                return False
+            self._pending_assets.add(asset)
+            return True
+
+    def _release_slot(self, asset):
+        with self._pending_lock:
+            self._pending_assets.discard(asset)
+        self.sem.release()
+
+    def metrics(self):
+        m = self.executor.metrics()
+        with self._pending_lock:
+            m["open_trades"] = len(self._pending_assets)
+        m["skipped_signals"] = self.skipped_signals
+        m["ml_rejected"] = self.ml_rejected
+        m["last_cycle"] = dict(self.last_cycle)
+        return m
 
     # ------------------------------------------------------------------
     def start(self):
         if self.running:
             return
         self.running = True
+        if self._executor_down:
+            self.executor = TradeExecutor(max_workers=self.executor.max_workers)
+            self._executor_down = False
+        self.iq.universe.on_change(self._on_universe_change)
+        if self.stream_candles:
+            self.iq.start_stream([], self.interval_sec)
         threading.Thread(target=self._run_loop, daemon=True).start()
+        self.trainer.start()
+        threading.Thread(target=self._checkpoint_loop, daemon=True).start()
         self._log(f"🚀 Bot iniciado | Watchlist TOP {self.watchlist_size}")
 
     def stop(self):
         self.running = False
+        if self.stream_candles:
+            self.iq.stop_stream()
+        self._wake.set()
+        # pool e thread de timers não sobrevivem ao engine; ordens ainda não enviadas
+        # são descartadas e liberam o slot do ativo
+        for fn, args in self.executor.shutdown():
+            if fn == self._trade_worker:
+                self._release_slot(args[0])
+        self._executor_down = True
+        self.trainer.stop()
+        self._checkpoint_ml()
         self._log("🛑 Bot parado")
 
+    def _on_universe_change(self, added, removed):
+        # ativo da watchlist fechou: força recalcular no próximo ciclo
+        closed = set(removed) & set(self._watchlist)
+        if closed:
+            self._watchlist_ts = 0
+            self._log(f"🔒 Fechados na watchlist: {', '.join(sorted(closed))}")
+
+    def _checkpoint_ml(self):
+        self.models.save_all()
+        # só grava se o modelo aprendeu algo desde o último checkpoint
+        seen = self.ml._seen
+        if not self.ml_path or seen == self._ml_saved_seen:
+            return
+        if self.ml.save(self.ml_path):
+            self._ml_saved_seen = seen
+
+    def _checkpoint_loop(self):
+        next_ts = time.time() + self.ml_checkpoint_sec
+        while self.running:
+            time.sleep(1.0)
+            if time.time() < next_ts:
+                continue
+            next_ts = time.time() + self.ml_checkpoint_sec
+            try:
+                self._checkpoint_ml()
+            except Exception as e:
+                self._log(f"⚠️ Checkpoint ML falhou: {e}")
+
     # ------------------------------------------------------------------
+    def _sleep_until(self, ts):
+        while self.running:
+            # limpa antes de checar: um set() entre a checagem e o wait não se perde
+            self._wake.clear()
+            remaining = ts - time.time()
+            if remaining <= 0:
+                return True
+            self._wake.wait(min(remaining, 1.0))
+        return False
+
     def _run_loop(self):
         while self.running:
             try:
                 assets = self.assets or self.iq.get_turbo_assets(include_otc=True, include_non_otc=True)[:150]
 
                 watch = self._refresh_watchlist(assets)
-                random.shuffle(watch)
 
-                for asset in watch:
-                    if not self.running:
-                        break
+                # Janela de avaliação: eval_lead_sec antes do fechamento do candle
+                boundary = self._next_candle_ts()
+                if self._local_ts(boundary) - time.time() < self.eval_lead_sec * 0.5:
+                    boundary += self.interval_sec
+                if not self._sleep_until(self._local_ts(boundary - self.eval_lead_sec)):
+                    break
+
+                self._evaluate_cycle(watch, boundary)
 
-                    payout = self.iq.get_payout_percent(asset)
-                    candles = self._get_candles(asset)
-                    if len(candles) < 60:
-                        continue
+                # não reavalia o mesmo candle
+                self._sleep_until(self._local_ts(boundary))
 
-                    _, highs, lows, closes = self._extract_ohlc(candles)
-                    atr_val = self._atr(highs, lows, closes, 14)
+            except Exception as e:
+                self._log(f"❌ Loop erro: {e}")
+                time.sleep(3)
 
-                    direction, score, reason = self._signal(closes)
-                    if not direction:
-                        continue
+    def _evaluate_cycle(self, watch, boundary):
+        """
+        Avalia a watchlist inteira numa janela curta antes do fechamento e agenda
+        as ordens para o fechamento (boundary, hora do servidor), antecipadas
+        pela latência de ida medida.
+        Ativos sem velas até o deadline contam como perdidos.
+        A watchlist (ordenada por score) é cortada no que cabe na janela pelo
+        custo medido de busca por ativo; estouro da janela vai para o log.
+        """
+        t0 = time.time()
+        send_at = self._local_ts(boundary, early=True)
+        deadline = send_at - self.send_margin_sec
+
+        capped = 0
+        cap = self._window_capacity(deadline - t0)
+        if cap is not None and len(watch) > cap:
+            capped = len(watch) - cap
+            self._log(f"✂️ Janela de {deadline - t0:.1f}s comporta ~{cap} ativos: "
+                      f"avaliando os {cap} melhores de {len(watch)}")
+            watch = watch[:cap]
+
+        fetched = self.iq.fetch_candles_many(
+            watch, self.interval_sec, self.candle_count,
+            max_workers=self.fetch_concurrency,
+            timeout_sec=self.fetch_timeout_sec, deadline=deadline,
+        ) if watch else {}
+        if watch:
+            # quem não chegou a tempo também custou: divide pelo que de fato veio
+            self._record_fetch_cost(max(1, len(fetched)), time.time() - t0)
+
+        evaluated = signals = missed = rejected = 0
+        candidates = []
+        for asset in watch:
+            if not self.running:
+                break
+
+            candles = fetched.get(asset)
+            if candles is None or time.time() > deadline:
+                missed += 1
+                continue
+            if len(candles) < 60:
+                continue
+            evaluated += 1
 
-                    final_conf = float(score)
-                    if final_conf < self._required_confidence():
-                        continue
+            payout = self.iq.get_payout_percent(asset)
+            ind = self.indicators.update(asset, self.interval_sec, candles)
+            closes = [float(c.get("close", 0.0)) for c in candles[-3:]]
 
-                    threading.Thread(
-                        target=self._trade_worker,
-                        args=(asset, direction, payout, final_conf, reason),
-                        daemon=True
-                    ).start()
+            direction, score, reason = self._signal(closes, ind)
+            if not direction:
+                continue
 
-                    time.sleep(0.2)
+            final_conf = float(score)
+            if final_conf < self._required_confidence():
+                continue
 
-                time.sleep(1.0)
+            candidates.append((asset, direction, payout, final_conf, reason, candles))
 
-            except Exception as e:
-                self._log(f"❌ Loop erro: {e}")
-                time.sleep(3)
+        if candidates and self.running:
+            # features e inferência do ciclo inteiro num único lote
+            features = self._features_batch(
+                [c[5] for c in candidates],
+                [c[2] or 0.0 for c in candidates],
+                [1.0 if c[1] == "call" else -1.0 for c in candidates],
+            )
+            if self.use_ml:
+                probs, ready = self.models.predict_proba_batch([c[0] for c in candidates], features)
+            else:
+                probs, ready = None, np.zeros(len(candidates), dtype=bool)
 
-    def _signal(self, closes):
-        if len(closes) < 60:
-            return None, 0, "poucas velas"
+            for i, (asset, direction, payout, final_conf, reason, _) in enumerate(candidates):
+                prob = float(probs[i]) if ready[i] else None
+                if prob is not None and prob < self.ml_threshold:
+                    rejected += 1
+                    continue
+                if not self._reserve_slot(asset):
+                    continue
 
-        ema21 = self._ema(closes, 21)
-        ema50 = self._ema(closes, 50)
+                if not self.executor.schedule_at(
+                    send_at, self._trade_worker,
+                    asset, direction, payout, final_conf, reason, features[i], prob
+                ):
+                    # engine parado no meio do ciclo: executor já desligado
+                    self._release_slot(asset)
+                    break
+                signals += 1
+            self.ml_rejected += rejected
+
+        self.last_cycle = {
+            "boundary": boundary,
+            "assets": len(watch),
+            "evaluated": evaluated,
+            "signals": signals,
+            "missed": missed,
+            "ml_rejected": rejected,
+            "capped": capped,
+            "eval_ms": (time.time() - t0) * 1000.0,
+        }
+        overrun = time.time() - send_at
+        if overrun > 0:
+            self._log(f"⚠️ Ciclo estourou a janela: avaliação terminou {overrun * 1000:.0f}ms depois do envio")
+        if missed:
+            self._log(f"⏱️ Ciclo {datetime.fromtimestamp(boundary).strftime('%H:%M:%S')}: "
+                      f"{missed}/{len(watch)} ativos perderam o deadline")
+
+    def _signal(self, closes, ind=None):
+        if ind is None:
+            if len(closes) < 60:
+                return None, 0, "poucas velas"
+            e21 = self._ema(closes, 21)
+            e50 = self._ema(closes, 50)
+            ema21 = e21[-1] if e21 is not None else None
+            ema50 = e50[-1] if e50 is not None else None
+        else:
+            ema21, ema50 = ind["ema"][21], ind["ema"][50]
         if ema21 is None or ema50 is None:
             return None, 0, "ema indisponível"
 
         c0, c1, c2 = closes[-1], closes[-2], closes[-3]
-        dist = abs(c0 - ema21[-1]) / max(1e-9, abs(ema21[-1]))
+        dist = abs(c0 - ema21) / max(1e-9, abs(ema21))
 
-        if ema21[-1] > ema50[-1] and dist <= 0.005 and c0 > c1 < c2:
+        if ema21 > ema50 and dist <= 0.005 and c0 > c1 < c2:
             return "call", 78, "pullback alta"
-        if ema21[-1] < ema50[-1] and dist <= 0.005 and c0 < c1 > c2:
+        if ema21 < ema50 and dist <= 0.005 and c0 < c1 > c2:
             return "put", 78, "pullback baixa"
 
         return None, 0, "sem sinal"
 
-    def _trade_worker(self, asset, direction, payout, conf, reason):
-        with self.sem:
-            self._wait_next_candle()
-
+    def _trade_worker(self, asset, direction, payout, conf, reason, features=None, prob=None):
+        # roda no pool do executor, já no início do candle (slot reservado no loop)
+        if not self.running:
+            self._release_slot(asset)
+            return
+        try:
             duration_min = max(1, self.interval_sec // 60)
 
             ok, order_id, market, err = self.iq.buy_best(
@@ -314,18 +638,41 @@ class BotEngine:
             )
             if not ok:
                 self._log(f"🚫 Compra falhou {asset}: {err}")
+                self._release_slot(asset)
                 return
 
-            self._log(f"⚡ REAL {asset} {direction.upper()} | conf={conf:.0f}% | {market} | id={order_id}")
+            prob_txt = f"{prob * 100:.0f}%" if prob is not None else f"{conf:.0f}%"
+            self._log(f"⚡ REAL {asset} {direction.upper()} | conf={conf:.0f}% | prob={prob_txt} | {market} | id={order_id}")
             self._send_trade_event(order_id, asset, "OPEN", direction, 0.0,
-                                   f"{int(payout)}%", f"{conf:.0f}%", f"WATCHLIST|{market}")
-
-            time.sleep(self.interval_sec)
+                                   f"{int(payout)}%", prob_txt, f"WATCHLIST|{market}")
+
+            # resultado liquidado pelo dispatcher central (sem thread parada esperando)
+            future = self.iq.watch_result(order_id, market, timeout_sec=120,
+                                          not_before=time.time() + self.interval_sec)
+            future.add_done_callback(
+                lambda f: self._on_trade_result(f, order_id, asset, direction, payout, prob_txt,
+                                                market, features)
+            )
+        except Exception as e:
+            self._log(f"❌ Erro no trade {asset}: {e}")
+            self._release_slot(asset)
 
-            result = self.iq.check_result(order_id, market, timeout_sec=120)
+    def _on_trade_result(self, future, order_id, asset, direction, payout, prob_txt, market, features=None):
+        try:
+            if future.cancelled():
+                # dispatcher parado (desconexão) com a ordem aberta: sem resultado, não é LOSS
+                self._log(f"⏹️ {asset} id={order_id}: acompanhamento encerrado sem resultado")
+                return
+            result = future.result()
             profit = float(result) if result is not None else -self.entry
             status = "WIN" if profit > 0 else "LOSS"
 
+            # aprendizado online: só resultados liquidados (timeout/empate não ensinam)
+            if features is not None and result is not None and profit != 0:
+                self.trainer.record(features, 1 if profit > 0 else 0, self.models.key_for(asset))
+
             self._send_trade_event(order_id, asset, status, direction, profit,
-                                   f"{int(payout)}%", f"{conf:.0f}%", f"WATCHLIST|{market}")
+                                   f"{int(payout)}%", prob_txt, f"WATCHLIST|{market}")
             self._log(f"🏁 {asset} => {status} | lucro={profit}")
+        finally:
+            self._release_slot(asset)
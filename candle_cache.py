@@ -0,0 +1,98 @@
+import threading
+import time
+
+
+class _Entry:
+    __slots__ = ("lock", "candles", "fetched_at")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.candles = []
+        self.fetched_at = 0.0
+
+
+class CandleCache:
+    """
+    Cache incremental de velas por (ativo, timeframe):
+    - Mantém uma janela rolante ordenada por 'from'.
+    - Busca na API apenas as velas mais novas que o último timestamp em cache (delta).
+    - Chamadas repetidas dentro de fresh_sec são servidas direto da memória.
+
+    fetch(asset, timeframe, count, endtime) deve ter a mesma assinatura do
+    IQ_Option.get_candles e retornar lista de dicts com 'from'.
+    """
+
+    def __init__(self, fetch, maxlen: int = 300, fresh_sec: float = 1.0):
+        self._fetch = fetch
+        self.maxlen = int(maxlen)
+        self.fresh_sec = float(fresh_sec)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.stats = {"hits": 0, "delta": 0, "full": 0}
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            return entry
+
+    def get(self, asset, timeframe, count):
+        timeframe = int(timeframe)
+        count = int(count)
+        entry = self._entry((asset, timeframe))
+
+        with entry.lock:
+            now = time.time()
+            cached = entry.candles
+
+            if len(cached) >= count:
+                if now - entry.fetched_at < self.fresh_sec:
+                    self.stats["hits"] += 1
+                    return cached[-count:]
+
+                # delta: da última vela em cache (ainda pode estar aberta) até agora
+                last_from = int(cached[-1]["from"])
+                missing = int((now - last_from) // timeframe) + 1
+                if missing < count:
+                    fresh = self._fetch(asset, timeframe, missing, now) or []
+                    self._merge(entry, fresh, count)
+                    entry.fetched_at = now
+                    self.stats["delta"] += 1
+                    return entry.candles[-count:]
+
+            fresh = self._fetch(asset, timeframe, count, now) or []
+            self.stats["full"] += 1
+            if fresh and all("from" in c for c in fresh):
+                entry.candles = []
+                self._merge(entry, fresh, count)
+                entry.fetched_at = now
+            return list(fresh)
+
+    def _merge(self, entry, fresh, count):
+        if not fresh:
+            return
+        fresh = sorted(fresh, key=lambda c: c["from"])
+        first = fresh[0]["from"]
+        candles = entry.candles
+        while candles and candles[-1]["from"] >= first:
+            candles.pop()
+        candles.extend(fresh)
+        excess = len(candles) - max(self.maxlen, count)
+        if excess > 0:
+            del candles[:excess]
+
+    def put(self, asset, timeframe, candles):
+        """Insere/atualiza velas vindas de outra fonte (ex.: stream em tempo real)."""
+        entry = self._entry((asset, int(timeframe)))
+        with entry.lock:
+            self._merge(entry, list(candles), 0)
+            entry.fetched_at = time.time()
+
+    def clear(self, asset=None):
+        with self._lock:
+            if asset is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == asset]:
+                    del self._entries[key]
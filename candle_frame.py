@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class CandleFrame:
+    """
+    Velas de um ativo em colunas NumPy (open/close/high/low/from), montadas uma
+    vez por ciclo e compartilhadas por todas as estratégias.
+    - tail(n) devolve as últimas n velas (views, sem cópia).
+    - cores: 1 verde, -1 vermelha, 0 doji (int8, calculado uma vez).
+    - candles mantém a lista original para quem precisa dos dicts (IndicatorEngine).
+    """
+
+    __slots__ = ("candles", "open", "close", "high", "low", "from_", "_cores")
+
+    def __init__(self, candles, columns=None):
+        self.candles = candles
+        self._cores = None
+        if columns is not None:
+            self.open, self.close, self.high, self.low, self.from_ = columns
+            return
+        n = len(candles)
+        self.open = np.fromiter((c['open'] for c in candles), dtype=float, count=n)
+        self.close = np.fromiter((c['close'] for c in candles), dtype=float, count=n)
+        self.high = np.fromiter((c.get('max', c['close']) for c in candles), dtype=float, count=n)
+        self.low = np.fromiter((c.get('min', c['close']) for c in candles), dtype=float, count=n)
+        self.from_ = np.fromiter((c.get('from', 0) for c in candles), dtype=np.int64, count=n)
+
+    def __len__(self):
+        return len(self.candles)
+
+    def tail(self, n):
+        if n >= len(self.candles):
+            return self
+        frame = CandleFrame(self.candles[-n:], (
+            self.open[-n:], self.close[-n:], self.high[-n:], self.low[-n:], self.from_[-n:],
+        ))
+        if self._cores is not None:
+            frame._cores = self._cores[-n:]
+        return frame
+
+    @property
+    def cores(self):
+        if self._cores is None:
+            self._cores = np.sign(self.close - self.open).astype(np.int8)
+        return self._cores
@@ -0,0 +1,130 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CandleStream:
+    """
+    Modo streaming (assina velas em vez de fazer polling de histórico):
+    - start_candles_stream / get_realtime_candles do stable_api por (ativo, timeframe).
+    - Mantém o buffer ao vivo de cada ativo e alimenta o CandleCache.
+    - Detecta o fechamento de vela (surge um novo 'from') e dispara os callbacks
+      on_close(asset, timeframe, candle) com a vela fechada.
+
+    A leitura de get_realtime_candles é local (o websocket já empurra os ticks),
+    então o laço interno roda a cada poll_sec sem custo de rede.
+    """
+
+    def __init__(self, api, cache=None, maxdict: int = 300, poll_sec: float = 0.05):
+        self.api = api
+        self.cache = cache
+        self.maxdict = int(maxdict)
+        self.poll_sec = float(poll_sec)
+
+        self._lock = threading.Lock()
+        self._subs = {}  # (asset, tf) -> (from da vela ao vivo, assinatura do último tick)
+        self._callbacks = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    def on_close(self, callback):
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+
+    def subscribe(self, asset, timeframe):
+        key = (asset, int(timeframe))
+        with self._lock:
+            if key in self._subs:
+                return True
+        try:
+            self.api.start_candles_stream(asset, key[1], self.maxdict)
+        except Exception as e:
+            logger.error(f"Erro start_candles_stream ({asset}): {e}")
+            return False
+        with self._lock:
+            self._subs[key] = (None, None)
+        return True
+
+    def unsubscribe(self, asset, timeframe):
+        key = (asset, int(timeframe))
+        with self._lock:
+            if self._subs.pop(key, None) is None:
+                return
+        try:
+            self.api.stop_candles_stream(asset, key[1])
+        except Exception as e:
+            logger.debug(f"Erro stop_candles_stream ({asset}): {e}")
+
+    def subscriptions(self):
+        with self._lock:
+            return list(self._subs)
+
+    def buffer(self, asset, timeframe):
+        """Velas ao vivo do ativo (ordenadas, a última ainda aberta)."""
+        try:
+            rt = self.api.get_realtime_candles(asset, int(timeframe)) or {}
+        except Exception:
+            return []
+        return [rt[k] for k in sorted(rt)]
+
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for asset, tf in self.subscriptions():
+            self.unsubscribe(asset, tf)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            for key in self.subscriptions():
+                try:
+                    self._poll(key)
+                except Exception as e:
+                    logger.debug(f"Erro stream {key}: {e}")
+            self._stop.wait(self.poll_sec)
+
+    def _poll(self, key):
+        asset, tf = key
+        rt = self.api.get_realtime_candles(asset, tf) or {}
+        if not rt:
+            return
+
+        stamps = sorted(rt)
+        live_from = stamps[-1]
+        live = rt[live_from]
+        tick = (live.get("close"), live.get("max"), live.get("min"))
+
+        with self._lock:
+            if key not in self._subs:
+                return
+            prev_from, prev_tick = self._subs[key]
+            if prev_from == live_from and prev_tick == tick:
+                return
+            self._subs[key] = (live_from, tick)
+            callbacks = list(self._callbacks)
+
+        if prev_from is None:
+            fresh = [rt[k] for k in stamps]
+            closed = []
+        else:
+            fresh = [rt[k] for k in stamps if k >= prev_from]
+            closed = [rt[k] for k in stamps if prev_from <= k < live_from]
+
+        if self.cache is not None:
+            self.cache.put(asset, tf, fresh)
+
+        for candle in closed:
+            for cb in callbacks:
+                try:
+                    cb(asset, tf, candle)
+                except Exception as e:
+                    logger.error(f"Erro callback de vela ({asset}): {e}")
@@ -0,0 +1,72 @@
+import time
+import threading
+from collections import deque
+
+
+class CandleTimer:
+    """
+    Disparo no mesmo ponto de cada vela, em hora do servidor (ClockSync):
+    - wait_next(tf) dorme até lead_sec antes do fechamento (já descontada a
+      latência de ida) e devolve o boundary, hora do servidor em que a próxima
+      vela abre. Nunca dispara duas vezes para o mesmo boundary.
+    - Se o gatilho já passou mas o fechamento não, dispara na hora (janela perdida
+      parcialmente); depois do fechamento, espera a vela seguinte.
+    - Sono em duas fases: sleep grosso em fatias (responde ao stop) e espera curta
+      nos últimos spin_sec.
+    - stats(): atraso médio/máximo dos disparos (jitter, ms).
+    """
+
+    def __init__(self, clock=None, lead_sec: float = 2.0, spin_sec: float = 0.02, window: int = 100):
+        self.clock = clock
+        self.lead_sec = float(lead_sec)
+        self.spin_sec = float(spin_sec)
+        self._last = {}
+        self._jitter = deque(maxlen=int(window))
+        self._lock = threading.Lock()
+        self.disparos = 0
+
+    def _server_now(self):
+        if self.clock is None:
+            return time.time()
+        return self.clock.now() + self.clock.one_way()
+
+    def next_trigger(self, tf):
+        """(boundary, gatilho) em hora do servidor para o próximo disparo."""
+        tf = max(1, int(tf))
+        now = self._server_now()
+        boundary = (int(now // tf) + 1) * tf
+        last = self._last.get(tf)
+        if last is not None and boundary <= last:
+            boundary = last + tf
+        return boundary, boundary - self.lead_sec
+
+    def wait_next(self, tf, running=None):
+        """Dorme até o gatilho; retorna o boundary ou None se running() ficou falso."""
+        boundary, gatilho = self.next_trigger(tf)
+        while True:
+            if running is not None and not running():
+                return None
+            remaining = gatilho - self._server_now()
+            if remaining <= 0:
+                break
+            if remaining > self.spin_sec:
+                time.sleep(min(remaining - self.spin_sec, 0.5))
+            else:
+                time.sleep(0)
+
+        atraso = self._server_now() - gatilho
+        with self._lock:
+            self._last[int(tf)] = boundary
+            self._jitter.append(max(0.0, atraso))
+            self.disparos += 1
+        return boundary
+
+    def stats(self):
+        with self._lock:
+            if not self._jitter:
+                return {"disparos": self.disparos, "jitter_ms": 0.0, "jitter_max_ms": 0.0}
+            return {
+                "disparos": self.disparos,
+                "jitter_ms": sum(self._jitter) / len(self._jitter) * 1000.0,
+                "jitter_max_ms": max(self._jitter) * 1000.0,
+            }
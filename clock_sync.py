@@ -0,0 +1,96 @@
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ClockSync:
+    """
+    Relógio corrigido pelo servidor da corretora:
+    - offset = hora do servidor - hora local. O timestamp do servidor chega pelo
+      websocket (get_server_timestamp); a amostra é tirada quando o valor muda e
+      o filtro de menor atraso (máximo da janela) descarta as amostras atrasadas.
+    - latência: RTT dos acks de ordem (record_rtt), média móvel; ida = RTT / 2.
+    - now() / to_local(): conversão entre hora do servidor e hora local.
+    """
+
+    def __init__(self, api=None, poll_sec: float = 0.05, window: int = 30, alpha: float = 0.2):
+        self.api = api
+        self.poll_sec = float(poll_sec)
+        self.alpha = float(alpha)
+        self._samples = deque(maxlen=int(window))
+        self._lock = threading.Lock()
+        self._last_server = None
+        self.offset = 0.0
+        self.rtt = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    def now(self):
+        return time.time() + self.offset
+
+    def to_local(self, server_ts):
+        return float(server_ts) - self.offset
+
+    def one_way(self):
+        return (self.rtt or 0.0) / 2.0
+
+    def record_rtt(self, seconds):
+        seconds = float(seconds)
+        if seconds <= 0 or seconds > 10:
+            return
+        with self._lock:
+            self.rtt = seconds if self.rtt is None else self.rtt + (seconds - self.rtt) * self.alpha
+
+    def next_boundary(self, interval_sec):
+        """Próximo fechamento de candle em hora do servidor."""
+        interval = max(1, int(interval_sec))
+        return (int(self.now() // interval) + 1) * interval
+
+    def stats(self):
+        return {"offset_ms": self.offset * 1000.0, "rtt_ms": (self.rtt or 0.0) * 1000.0,
+                "samples": len(self._samples)}
+
+    # ------------------------------------------------------------------
+    def sample(self):
+        if self.api is None:
+            return
+        try:
+            server = self.api.get_server_timestamp()
+        except Exception as e:
+            logger.debug(f"Erro get_server_timestamp: {e}")
+            return
+        if not server:
+            return
+        server = float(server)
+        if server > 1e11:  # veio em ms
+            server /= 1000.0
+        local = time.time()
+        with self._lock:
+            if server == self._last_server:
+                return
+            first = self._last_server is None
+            self._last_server = server
+            if first:
+                return  # o primeiro valor pode ser antigo; espera a próxima mudança
+            # a mensagem viajou ~ida até chegar: soma a latência estimada
+            self._samples.append(server + self.one_way() - local)
+            self.offset = max(self._samples)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.poll_sec)
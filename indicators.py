@@ -0,0 +1,131 @@
+import threading
+from collections import deque
+
+
+def _ohlc(candle):
+    close = float(candle.get("close", 0.0))
+    high = float(candle.get("max", candle.get("high", close)))
+    low = float(candle.get("min", candle.get("low", close)))
+    return high, low, close
+
+
+class IndicatorState:
+    """
+    Estado incremental de um (ativo, timeframe):
+    - EMA por período e fila de True Range das velas FECHADAS.
+    - A vela ao vivo (última) nunca é gravada: entra só no cálculo do valor atual.
+    """
+
+    __slots__ = ("last_from", "count", "ema", "prev_close", "trs")
+
+    def __init__(self, ema_periods, atr_period):
+        self.last_from = None
+        self.count = 0
+        self.ema = {p: None for p in ema_periods}
+        self.prev_close = None
+        self.trs = deque(maxlen=max(0, atr_period - 1))
+
+    def step(self, candle):
+        high, low, close = _ohlc(candle)
+        for period, value in self.ema.items():
+            if value is None:
+                self.ema[period] = close
+            else:
+                self.ema[period] = value + (close - value) * (2.0 / (period + 1.0))
+        if self.prev_close is not None and self.trs.maxlen:
+            pc = self.prev_close
+            self.trs.append(max(high - low, abs(high - pc), abs(low - pc)))
+        self.prev_close = close
+        self.last_from = candle["from"]
+        self.count += 1
+
+
+class IndicatorEngine:
+    """
+    EMA/ATR incrementais por (ativo, timeframe):
+    - update() aplica só as velas fechadas novas desde a última chamada: O(1) por vela.
+    - Buraco na sequência de 'from' (ou janela que não cobre o estado) => reseed
+      automático a partir das velas recebidas.
+    - Semântica igual à dos helpers antigos: EMA semeada no primeiro close da janela,
+      ATR = média simples dos últimos atr_period TRs (incluindo a vela ao vivo).
+    """
+
+    def __init__(self, ema_periods=(21, 50), atr_period: int = 14):
+        self.ema_periods = tuple(int(p) for p in ema_periods)
+        self.atr_period = int(atr_period or 0)
+        self._states = {}
+        self._lock = threading.Lock()
+        self.reseeds = 0
+
+    def _new_state(self):
+        return IndicatorState(self.ema_periods, self.atr_period)
+
+    def update(self, asset, timeframe, candles):
+        """
+        Retorna {"ema": {periodo: valor|None}, "atr": valor|None, "close": close_atual}
+        ou None se não houver velas suficientes.
+        """
+        if not candles or len(candles) < 2 or "from" not in candles[-1]:
+            return None
+
+        timeframe = int(timeframe)
+        key = (asset, timeframe)
+        closed = candles[:-1]
+
+        with self._lock:
+            state = self._states.get(key)
+            new = self._new_closed(state, closed, timeframe)
+            if new is None:
+                state = self._new_state()
+                new = closed
+                self.reseeds += 1
+                self._states[key] = state
+            for candle in new:
+                state.step(candle)
+            return self._live_values(state, candles[-1])
+
+    @staticmethod
+    def _new_closed(state, closed, timeframe):
+        """Velas fechadas ainda não aplicadas, ou None se precisa reseed."""
+        if state is None or state.last_from is None or not closed:
+            return None
+        last_from = state.last_from
+        newest = closed[-1]["from"]
+        if newest < last_from:
+            return None
+        i = len(closed)
+        while i > 0 and closed[i - 1]["from"] > last_from:
+            i -= 1
+        if i == 0 or closed[i - 1]["from"] != last_from:
+            return None  # janela não contém mais o ponto de continuidade
+        new = closed[i:]
+        if new and new[0]["from"] - last_from != timeframe:
+            return None  # buraco de velas
+        return new
+
+    def _live_values(self, state, live):
+        high, low, close = _ohlc(live)
+        n = state.count + 1
+
+        ema = {}
+        for period, value in state.ema.items():
+            if value is None or n < period:
+                ema[period] = None
+            else:
+                ema[period] = value + (close - value) * (2.0 / (period + 1.0))
+
+        atr = None
+        if self.atr_period and n >= self.atr_period + 2 and state.prev_close is not None:
+            pc = state.prev_close
+            live_tr = max(high - low, abs(high - pc), abs(low - pc))
+            atr = (sum(state.trs) + live_tr) / float(self.atr_period)
+
+        return {"ema": ema, "atr": atr, "close": close}
+
+    def reset(self, asset=None):
+        with self._lock:
+            if asset is None:
+                self._states.clear()
+            else:
+                for key in [k for k in self._states if k[0] == asset]:
+                    del self._states[key]
@@ -1,18 +1,54 @@
 import time
 import logging
+import threading
+from concurrent.futures import CancelledError
 from iqoptionapi.stable_api import IQ_Option
 
+from asset_universe import AssetUniverse
+from candle_cache import CandleCache
+from candle_stream import CandleStream
+from clock_sync import ClockSync
+from market_snapshot import OpenMarketsSnapshot, PayoutSnapshot
+from parallel_fetch import fetch_many
+from result_dispatcher import ResultDispatcher, probe_binary
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class IQService:
-    def __init__(self, email, password, account_type="PRACTICE"):
+    def __init__(self, email, password, account_type="PRACTICE", candle_cache_size=300,
+                 payout_ttl_sec=30, open_ttl_sec=60, api_concurrency=1, api=None):
         self.email = email
-        self.api = IQ_Option(email, password)
+        # api: cliente já construído com a interface do IQ_Option (ex.: SimBroker)
+        self.api = api if api is not None else IQ_Option(email, password)
         self.account_type = account_type.upper()
         self.connected = False
 
+        # Cache compartilhado de velas (delta fetch por ativo/timeframe)
+        self.candles = CandleCache(self._fetch_candles, maxlen=candle_cache_size)
+        # O get_candles do stable_api guarda a resposta num único slot compartilhado,
+        # então chamadas simultâneas se atropelam: limita quantas vão à rede juntas.
+        self._api_sem = threading.BoundedSemaphore(max(1, int(api_concurrency)))
+        self.stream = None
+
+        # Snapshot de payouts (get_all_profit em background, lookup O(1))
+        self.payouts = PayoutSnapshot(self.api.get_all_profit, ttl_sec=payout_ttl_sec)
+
+        # Snapshot de mercados abertos (get_all_open_time fora do caminho da ordem)
+        self.markets = OpenMarketsSnapshot(self.api.get_all_open_time, ttl_sec=open_ttl_sec)
+        # Universo de ativos abertos (listas prontas + deltas a cada refresh)
+        self.universe = AssetUniverse(self.markets)
+
+        # Relógio do servidor (offset + latência das ordens)
+        self.clock = ClockSync(self.api)
+
+        # Liquidação central de ordens (um thread para todas as ordens pendentes)
+        self.results = ResultDispatcher({
+            "binary": self._probe_binary_result,
+            "digital": self._probe_digital_result,
+        })
+
     def connect(self):
         try:
             logger.info(f"Conectando com email: {self.email[:3]}...")
@@ -21,6 +57,9 @@ class IQService:
                 logger.info(f"Conexão OK, mudando para conta: {self.account_type}")
                 self.api.change_balance(self.account_type)
                 self.connected = True
+                self.payouts.start()
+                self.markets.start()
+                self.clock.start()
                 return True
             else:
                 logger.error(f"Falha na conexão: {reason}")
@@ -29,6 +68,14 @@ class IQService:
             logger.error(f"Erro na conexão: {e}")
             return False
 
+    def close(self):
+        """Para as threads de background (snapshots/stream)."""
+        self.payouts.stop()
+        self.markets.stop()
+        self.results.stop()
+        self.clock.stop()
+        self.stop_stream()
+
     def get_balance(self):
         try:
             balance = self.api.get_balance()
@@ -39,74 +86,14 @@ class IQService:
             return None
 
     def get_turbo_assets(self, include_otc=True, include_non_otc=True):
-        """Retorna ativos turbo com sufixos corretos"""
+        """Retorna ativos turbo/binary abertos (lista pré-computada do universo)"""
         try:
-            logger.info(f"Obtendo ativos: OTC={include_otc}, Não-OTC={include_non_otc}")
-            all_assets = self.api.get_all_open_time()
-            
-            if not all_assets:
-                logger.warning("API não retornou ativos")
-                return self._get_fallback_assets(include_otc, include_non_otc)
-            
-            opened = []
-            
-            # Procura em turbo e binary
-            for type_name in ['turbo', 'binary']:
-                if type_name in all_assets:
-                    logger.debug(f"Analisando tipo: {type_name}")
-                    type_data = all_assets[type_name]
-                    
-                    if not isinstance(type_data, dict):
-                        logger.warning(f"Dados do tipo {type_name} inválidos")
-                        continue
-                    
-                    for asset_name, data in type_data.items():
-                        try:
-                            if not isinstance(data, dict):
-                                continue
-                                
-                            # Verifica se está aberto
-                            is_open = data.get('open', False) or data.get('enabled', False)
-                            
-                            if is_open:
-                                # Mantém o nome EXATO como a API retorna
-                                opened.append(asset_name)
-                                logger.debug(f"Ativo {asset_name} - Aberto")
-                                
-                        except Exception as e:
-                            logger.debug(f"Erro processando {asset_name}: {e}")
-                            continue
-            
-            # Filtra conforme solicitado
-            filtered_assets = []
-            for asset in opened:
-                asset_lower = asset.lower()
-                
-                # Decide se inclui baseado nos parâmetros
-                include = False
-                
-                if '-otc' in asset_lower and include_otc:
-                    include = True
-                elif '-op' in asset_lower and include_non_otc:
-                    include = True
-                elif (not '-otc' in asset_lower and not '-op' in asset_lower) and include_non_otc:
-                    include = True  # Ativos sem sufixo (raros)
-                
-                if include:
-                    filtered_assets.append(asset)
-            
-            logger.info(f"Total ativos encontrados: {len(opened)}, filtrados: {len(filtered_assets)}")
-            
-            if not filtered_assets:
-                logger.warning("Nenhum ativo após filtro, usando fallback")
+            assets = self.universe.assets(include_otc, include_non_otc)
+            if not assets:
+                logger.warning("Nenhum ativo aberto no snapshot, usando fallback")
                 return self._get_fallback_assets(include_otc, include_non_otc)
-            
-            # Log dos primeiros ativos para debug
-            if filtered_assets:
-                logger.info(f"Primeiros 10 ativos: {filtered_assets[:10]}")
-            
-            return sorted(list(set(filtered_assets)))
-            
+            return assets
+
         except Exception as e:
             logger.error(f"Erro get_turbo_assets: {e}")
             return self._get_fallback_assets(include_otc, include_non_otc)
@@ -146,8 +133,10 @@ class IQService:
             # IMPORTANTE: Usa o nome EXATO como a API retornou
             direction = direction.lower()  # "call" ou "put"
             
-            # Tenta comprar
+            # Tenta comprar (o tempo até o ack alimenta a estimativa de latência)
+            t0 = time.time()
             ok, id = self.api.buy(amount, asset, direction, duration)
+            self.clock.record_rtt(time.time() - t0)
             
             if ok:
                 logger.info(f"✅ Compra OK! ID: {id}")
@@ -161,6 +150,41 @@ class IQService:
             logger.error(f"🔥 Erro em buy_binary: {error_msg}")
             return False, None, error_msg
 
+    def _probe_binary_result(self, order_id):
+        """Consulta única (não-bloqueante) do resultado binário/turbo."""
+        finished, profit = probe_binary(self.api, order_id)
+        if finished:
+            logger.info(f"Resultado: {order_id}, Valor: {profit}")
+        return finished, profit
+
+    def _probe_digital_result(self, order_id):
+        """
+        Consulta única (não-bloqueante) do resultado DIGITAL.
+        check_win_digital_v2 fica em espera ativa enquanto o evento
+        'position-changed' da ordem não chegou: só chama depois dele.
+        """
+        if not hasattr(self.api, "get_async_order") or not hasattr(self.api, "check_win_digital_v2"):
+            return False, None
+        order = self.api.get_async_order(order_id) or {}
+        if not order.get("position-changed"):
+            return False, None
+
+        ok, profit = self.api.check_win_digital_v2(order_id)
+        if ok is True:
+            return True, float(profit)
+        return False, None
+
+    def watch_result(self, order_id, market: str, timeout_sec: int = 45, not_before=None):
+        """
+        Registra a ordem no dispatcher central e devolve um Future com o profit
+        (positivo WIN, negativo LOSS, 0 empate) ou None em timeout.
+        not_before: timestamp a partir do qual vale consultar (vencimento).
+        """
+        market = (market or "").lower()
+        if market != "digital":
+            market = "binary"
+        return self.results.watch(order_id, market, timeout_sec=timeout_sec, not_before=not_before)
+
     def check_binary_result(self, order_id, timeout_sec=None):
         """Busca o resultado real"""
         if not order_id:
@@ -169,73 +193,90 @@ class IQService:
         
         try:
             max_wait = timeout_sec if timeout_sec else 90
-            start_time = time.time()
-            
             logger.info(f"Aguardando resultado para ID: {order_id}")
-            
-            while time.time() - start_time < max_wait:
-                try:
-                    # Tenta check_win_v4 primeiro
-                    result = self.api.check_win_v4(order_id)
-                    
-                    if result is not None:
-                        win_status, profit_amount = result
-                        logger.info(f"Resultado: {win_status}, Valor: {profit_amount}")
-                        
-                        if win_status == 'win':
-                            return float(profit_amount) if profit_amount else 0.0
-                        elif win_status == 'equal':
-                            return 0.0
-                        elif win_status == 'loose':
-                            return float(profit_amount) if profit_amount else 0.0
-                    
-                    time.sleep(2)  # Polling a cada 2s
-                    
-                except Exception as e:
-                    logger.debug(f"Erro durante polling: {e}")
-                    time.sleep(2)
-            
-            # Timeout
-            logger.warning(f"⏰ Timeout para order {order_id}")
-            return None
+            return self.watch_result(order_id, "binary", timeout_sec=max_wait).result()
             
         except Exception as e:
             logger.error(f"Erro check_binary_result: {e}")
             return None
 
+    def _fetch_candles(self, asset, timeframe, count, endtime):
+        with self._api_sem:
+            return self.api.get_candles(asset, timeframe, count, endtime)
+
     def get_candles(self, asset, timeframe, count):
-        """Obtém velas históricas"""
+        """Obtém velas históricas (servidas do cache, buscando só o delta)"""
         try:
             logger.debug(f"Obtendo candles: {asset}, TF: {timeframe}, Count: {count}")
-            return self.api.get_candles(asset, timeframe, count, time.time())
+            return self.candles.get(asset, timeframe, count)
             
         except Exception as e:
             logger.error(f"Erro get_candles ({asset}): {e}")
             return []
 
+    # ===================== STREAMING DE VELAS =====================
+    def start_stream(self, assets, timeframe, on_close=None, maxdict=300):
+        """
+        Ativa o modo streaming: assina velas em tempo real dos ativos.
+        Enquanto ativo, get_candles é servido do buffer ao vivo (sem polling)
+        e on_close(asset, timeframe, candle) é chamado a cada vela fechada.
+        """
+        if self.stream is None:
+            self.stream = CandleStream(self.api, cache=self.candles, maxdict=maxdict)
+        if on_close:
+            self.stream.on_close(on_close)
+        for asset in assets:
+            self.stream.subscribe(asset, timeframe)
+        self.stream.start()
+        return self.stream
+
+    def stream_assets(self, assets, timeframe):
+        """Ajusta as assinaturas para exatamente estes ativos."""
+        if self.stream is None:
+            return
+        wanted = set(assets)
+        for asset, tf in self.stream.subscriptions():
+            if tf == int(timeframe) and asset not in wanted:
+                self.stream.unsubscribe(asset, tf)
+        for asset in assets:
+            self.stream.subscribe(asset, timeframe)
+
+    def on_candle_close(self, callback):
+        if self.stream is not None:
+            self.stream.on_close(callback)
+
+    def stop_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+
+    def fetch_candles_many(self, assets, timeframe, count, max_workers=8, timeout_sec=10.0, deadline=None):
+        """
+        Busca velas de vários ativos em paralelo (pool limitado, timeout por ativo
+        e, se dado, um deadline absoluto em time.time() para o lote inteiro).
+        Retorna dict ativo -> velas só com os que responderam a tempo (parcial).
+        Acertos de cache saem na hora; idas à rede respeitam api_concurrency.
+        """
+        results, late = fetch_many(
+            lambda asset: self.get_candles(asset, timeframe, count),
+            assets, max_workers=max_workers, item_timeout=timeout_sec, deadline=deadline,
+        )
+        if late:
+            logger.warning(f"{len(late)} ativos sem velas a tempo: {late[:5]}")
+        return results
+
     def get_turbo_payout(self, asset):
-        """Retorna payout como fração"""
+        """Retorna payout como fração (lido do snapshot, sem ir à rede)"""
         try:
-            # Remove sufixos para lookup
-            clean_name = asset
-            for suffix in ['-op', '-OTC', '-otc']:
-                if clean_name.endswith(suffix):
-                    clean_name = clean_name[:-len(suffix)]
-                    break
-            
-            logger.debug(f"Buscando payout para {asset} (clean: {clean_name})")
-            
-            all_profit = self.api.get_all_profit()
-            
-            if clean_name in all_profit:
-                if 'turbo' in all_profit[clean_name]:
-                    payout = all_profit[clean_name]['turbo']
-                    logger.debug(f"Payout turbo: {payout}")
-                    return payout
-                elif 'binary' in all_profit[clean_name]:
-                    payout = all_profit[clean_name]['binary']
-                    logger.debug(f"Payout binary: {payout}")
-                    return payout
+            payouts = self.payouts.lookup(asset)
+
+            if payouts:
+                if 'turbo' in payouts:
+                    logger.debug(f"Payout turbo {asset}: {payouts['turbo']}")
+                    return payouts['turbo']
+                elif 'binary' in payouts:
+                    logger.debug(f"Payout binary {asset}: {payouts['binary']}")
+                    return payouts['binary']
             
             # Fallback baseado no tipo
             if '-OTC' in asset or '-otc' in asset:
@@ -293,9 +334,9 @@ class IQService:
 
     # ===================== MULTI-MERCADO (DIGITAL + BINÁRIA/TURBO) =====================
     def get_all_open(self):
-        """Retorna o dicionário completo de mercados abertos (binary/turbo/digital)."""
+        """Retorna o dicionário completo de mercados abertos (binary/turbo/digital) do snapshot."""
         try:
-            return self.api.get_all_open_time()
+            return self.markets.raw()
         except Exception as e:
             logger.error(f"Erro get_all_open_time: {e}")
             return {}
@@ -306,10 +347,7 @@ class IQService:
         Observação: no iqoptionapi, 'turbo' e 'binary' aparecem separados em get_all_open_time().
         """
         try:
-            all_open = self.get_all_open()
-            md = all_open.get(market, {})
-            info = md.get(asset, {})
-            return bool(info.get("open", False))
+            return self.markets.is_open(asset, market)
         except Exception:
             return False
 
@@ -319,6 +357,9 @@ class IQService:
         Dependendo da versão do iqoptionapi, pode existir:
           - get_digital_current_profit(asset, duration_min) -> float (ex 0.92)
         """
+        cached = self.payouts.digital(asset, duration_min)
+        if cached is not None:
+            return round(cached * 100.0, 0)
         try:
             if hasattr(self.api, "get_digital_current_profit"):
                 p = self.api.get_digital_current_profit(asset, duration_min)
@@ -327,8 +368,11 @@ class IQService:
                 p = float(p)
                 # se vier 0.92 => 92%
                 if 0 < p <= 2:
-                    return round(p * 100.0, 0)
-                return round(p, 0)
+                    p = round(p * 100.0, 0)
+                else:
+                    p = round(p, 0)
+                self.payouts.put_digital(asset, p / 100.0, duration_min)
+                return p
         except Exception as e:
             logger.debug(f"Digital payout erro: {e}")
         return None
@@ -342,7 +386,9 @@ class IQService:
             direction = direction.lower()
             duration_min = int(duration_min)
             if hasattr(self.api, "buy_digital_spot"):
+                t0 = time.time()
                 ok, order_id = self.api.buy_digital_spot(asset, amount, direction, duration_min)
+                self.clock.record_rtt(time.time() - t0)
                 if ok:
                     return True, order_id, None
                 return False, None, "buy_digital_spot retornou False"
@@ -359,29 +405,14 @@ class IQService:
 
     def check_digital_result(self, order_id, timeout_sec: int = 45):
         """
-        Espera o resultado DIGITAL. Tolerante a versões:
-          - check_win_digital_v2(order_id) -> (bool, profit)
-          - check_win_digital(order_id) -> profit
+        Espera o resultado DIGITAL (via dispatcher central).
         Retorna profit (float): positivo WIN, negativo LOSS, 0 empate/erro.
         """
-        t0 = time.time()
-        while time.time() - t0 < max(5, timeout_sec):
-            try:
-                # v2
-                if hasattr(self.api, "check_win_digital_v2"):
-                    ok, profit = self.api.check_win_digital_v2(order_id)
-                    if ok is True:
-                        return float(profit)
-                # v1
-                if hasattr(self.api, "check_win_digital"):
-                    profit = self.api.check_win_digital(order_id)
-                    # algumas versões retornam None enquanto não fechou
-                    if profit is not None:
-                        return float(profit)
-            except Exception:
-                pass
-            time.sleep(1)
-        return None
+        try:
+            return self.watch_result(order_id, "digital", timeout_sec=max(5, timeout_sec)).result()
+        except CancelledError:
+            # serviço fechado antes do resultado
+            return None
 
     def buy_best(self, asset: str, amount: float, direction: str, duration_min: int,
                  prefer=("digital", "turbo", "binary")):
@@ -393,9 +424,8 @@ class IQService:
         duration_min = int(duration_min)
         direction = direction.lower()
 
-        # Descobre mercados abertos
-        all_open = self.get_all_open()
-        open_markets = set(k for k in ("digital", "turbo", "binary") if k in all_open)
+        # Descobre mercados abertos (snapshot em memória, sem ir à rede)
+        open_markets = self.markets.markets()
 
         for market in prefer:
             if market not in open_markets:
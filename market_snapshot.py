@@ -0,0 +1,172 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_asset(asset: str) -> str:
+    """Nome canônico para lookup: maiúsculo e sem o sufixo '-op'."""
+    name = (asset or "").strip().upper()
+    if name.endswith("-OP"):
+        name = name[:-3]
+    return name
+
+
+class BackgroundSnapshot:
+    """
+    Snapshot de dados de mercado atualizado em background:
+    - refresh() busca na API e reconstrói o índice (_build).
+    - start() mantém uma thread daemon atualizando a cada ttl_sec.
+    - get() nunca vai à rede se já existe snapshot (só na primeira leitura).
+    - current() devolve o último snapshot sem nunca ir à rede (None se não há).
+    - add_listener(fn) recebe fn(data) após cada atualização bem-sucedida.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, fetch, ttl_sec: float = 30.0):
+        self._fetch = fetch
+        self.ttl_sec = float(ttl_sec)
+        self._lock = threading.Lock()
+        self._data = None
+        self.updated_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+    def add_listener(self, fn):
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def _build(self, raw):
+        return raw
+
+    def refresh(self):
+        try:
+            raw = self._fetch()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar {self.name}: {e}")
+            return self._data
+        if not raw:
+            logger.warning(f"{self.name}: API retornou vazio, mantendo snapshot anterior")
+            return self._data
+        data = self._build(raw)
+        with self._lock:
+            self._data = data
+            self.updated_at = time.time()
+        for fn in list(self._listeners):
+            try:
+                fn(data)
+            except Exception as e:
+                logger.error(f"Erro listener {self.name}: {e}")
+        return data
+
+    def get(self):
+        data = self._data
+        if data is None:
+            data = self.refresh()
+        return data
+
+    def current(self):
+        return self._data
+
+    def age(self):
+        return time.time() - self.updated_at if self.updated_at else float("inf")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.ttl_sec)
+
+
+class PayoutSnapshot(BackgroundSnapshot):
+    """
+    Payouts (fração, ex.: 0.87) indexados pelo nome normalizado do ativo.
+    - turbo/binary vêm de get_all_profit() numa única chamada por ciclo.
+    - digital é registrado sob demanda (put_digital) e expira após ttl_sec.
+    """
+
+    name = "payouts"
+
+    def __init__(self, fetch, ttl_sec: float = 30.0):
+        super().__init__(fetch, ttl_sec)
+        self._digital = {}
+
+    def _build(self, raw):
+        index = {}
+        for asset, markets in raw.items():
+            if not isinstance(markets, dict):
+                continue
+            entry = {}
+            for market in ("turbo", "binary"):
+                try:
+                    entry[market] = float(markets[market])
+                except (KeyError, TypeError, ValueError):
+                    continue
+            if entry:
+                index[normalize_asset(asset)] = entry
+        return index
+
+    def lookup(self, asset):
+        """Retorna {'turbo': x, 'binary': y} do ativo ou None."""
+        index = self.get() or {}
+        name = normalize_asset(asset)
+        entry = index.get(name)
+        if entry is None and name.endswith("-OTC"):
+            entry = index.get(name[:-4])
+        return entry
+
+    def put_digital(self, asset, payout, duration_min=1):
+        self._digital[(normalize_asset(asset), int(duration_min))] = (float(payout), time.time())
+
+    def digital(self, asset, duration_min=1):
+        item = self._digital.get((normalize_asset(asset), int(duration_min)))
+        if item is None or time.time() - item[1] > self.ttl_sec:
+            return None
+        return item[0]
+
+
+class OpenMarketsSnapshot(BackgroundSnapshot):
+    """
+    Horário de mercados (get_all_open_time) mantido em background:
+    - raw: o dicionário completo como a API retorna (binary/turbo/digital).
+    - open: market -> frozenset dos ativos abertos, para is_open O(1).
+    """
+
+    name = "open_markets"
+
+    def _build(self, raw):
+        opened = {}
+        for market, assets in raw.items():
+            if not isinstance(assets, dict):
+                continue
+            opened[market] = frozenset(
+                asset for asset, info in assets.items()
+                if isinstance(info, dict) and info.get("open", False)
+            )
+        return {"raw": raw, "open": opened}
+
+    def raw(self):
+        data = self.get()
+        return data["raw"] if data else {}
+
+    def markets(self):
+        data = self.get()
+        return set(data["open"]) if data else set()
+
+    def is_open(self, asset, market):
+        data = self.get()
+        if not data:
+            return False
+        return asset in data["open"].get(market, ())
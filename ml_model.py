@@ -1,7 +1,12 @@
+import os
+import threading
 import numpy as np
 from sklearn.linear_model import SGDClassifier
 from sklearn.preprocessing import StandardScaler
 
+# versão do formato de checkpoint (npz); muda quando os campos mudam
+CHECKPOINT_VERSION = 1
+
 
 class MLModel:
     """
@@ -10,6 +15,11 @@ class MLModel:
     - SGDClassifier (log_loss)
     - predict_proba robusto (retorna prob de WIN)
     - mantém compatibilidade com bots antigos: train(X,y), partial_fit(X,y), predict_proba(X)
+    - inferência compilada: após cada partial_fit o scaler é dobrado nos pesos
+      (w = coef/scale, b = intercept - mean·w) e a predição é um único produto
+      NumPy + sigmoide, sem a validação do sklearn (1 linha ou lote)
+    - save(path)/load(path): checkpoint versionado (.npz) do scaler, pesos e _seen,
+      gravado de forma atômica; load restaura o estado aquecido sem re-treinar
 
     Observação:
     - Features esperadas: array 1D (n_features,) ou 2D (1,n_features).
@@ -27,6 +37,10 @@ class MLModel:
         self._seen = 0
         self.is_fitted = False
         self._classes = np.array([0, 1], dtype=int)
+        # pesos compilados (w, b) publicados juntos numa tupla: a inferência lê
+        # sem lock enquanto o treino (em outra thread) atualiza o modelo
+        self._compiled = None
+        self._fit_lock = threading.Lock()
 
     def _to_2d(self, X):
         X = np.asarray(X, dtype=float)
@@ -34,23 +48,42 @@ class MLModel:
             X = X.reshape(1, -1)
         return X
 
-    def partial_fit(self, X, y):
+    def partial_fit(self, X, y, new=None):
+        """
+        new: quantas linhas (do fim de X) são amostras inéditas; None = todas.
+        Linhas de replay treinam o modelo mas não entram de novo no scaler nem em _seen.
+        """
         X = self._to_2d(X)
         y = np.asarray(y, dtype=int).reshape(-1)
+        new = len(y) if new is None else max(0, min(int(new), len(y)))
 
-        # scaler incremental
-        self.scaler.partial_fit(X)
-        Xs = self.scaler.transform(X)
+        with self._fit_lock:
+            # scaler incremental (só amostras novas)
+            if new:
+                self.scaler.partial_fit(X[len(y) - new:])
+            Xs = self.scaler.transform(X)
 
-        if not self.is_fitted:
-            self.model.partial_fit(Xs, y, classes=self._classes)
-            self.is_fitted = True
-        else:
-            self.model.partial_fit(Xs, y)
+            if not self.is_fitted:
+                self.model.partial_fit(Xs, y, classes=self._classes)
+                self.is_fitted = True
+            else:
+                self.model.partial_fit(Xs, y)
 
-        self._seen += len(y)
+            self._seen += new
+            self._compile()
         return True
 
+    def _compile(self):
+        """Dobra o StandardScaler nos pesos do modelo linear."""
+        coef = np.asarray(self.model.coef_, dtype=float).reshape(-1)
+        w = coef / np.asarray(self.scaler.scale_, dtype=float)
+        b = float(self.model.intercept_[0]) - float(np.dot(self.scaler.mean_, w))
+        self._compiled = (w, b)
+
+    @staticmethod
+    def _sigmoid(z):
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -500.0, 500.0)))
+
     def train(self, X, y):
         return self.partial_fit(X, [y] if np.isscalar(y) else y)
 
@@ -62,14 +95,96 @@ class MLModel:
         Retorna probabilidade de WIN (classe 1) como float (0..1).
         Se não estiver pronto, retorna 0.5.
         """
-        if not self.is_fitted:
+        compiled = self._compiled
+        if compiled is None:
             return 0.5
 
-        X = self._to_2d(X)
+        w, b = compiled
         try:
-            Xs = self.scaler.transform(X)
-            proba = self.model.predict_proba(Xs)
-            # proba shape: (n,2) [p0,p1]
-            return float(proba[-1][1])
+            x = np.asarray(X, dtype=float).reshape(-1, w.shape[0])[-1]
+            return float(self._sigmoid(x.dot(w) + b))
         except Exception:
             return 0.5
+
+    def predict_proba_batch(self, X):
+        """
+        Probabilidade de WIN para cada linha de X (n, n_features) -> array (n,).
+        Se não estiver pronto, retorna 0.5 para todas.
+        """
+        X = self._to_2d(X)
+        compiled = self._compiled
+        if compiled is None:
+            return np.full(X.shape[0], 0.5)
+
+        w, b = compiled
+        try:
+            return self._sigmoid(X.dot(w) + b)
+        except Exception:
+            return np.full(X.shape[0], 0.5)
+
+    # ------------------------------------------------------------------
+    def save(self, path):
+        """Grava o checkpoint em path (atômico: tmp + os.replace)."""
+        if not self.is_fitted:
+            return False
+        with self._fit_lock:
+            state = self._state()
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, **state)
+            os.replace(tmp, path)
+            return True
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+
+    def _state(self):
+        return {
+            "version": np.array(CHECKPOINT_VERSION),
+            "seen": np.array(self._seen),
+            "warmup": np.array(self.warmup),
+            "scaler_mean": self.scaler.mean_.copy(),
+            "scaler_var": self.scaler.var_.copy(),
+            "scaler_scale": self.scaler.scale_.copy(),
+            "scaler_n": np.array(self.scaler.n_samples_seen_),
+            "coef": self.model.coef_.copy(),
+            "intercept": self.model.intercept_.copy(),
+            "t": np.array(self.model.t_),
+            "n_iter": np.array(self.model.n_iter_),
+        }
+
+    def load(self, path):
+        """Restaura um checkpoint salvo por save(); False se ausente/incompatível."""
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != CHECKPOINT_VERSION:
+                    return False
+                state = {k: data[k] for k in data.files}
+        except Exception:
+            return False
+
+        with self._fit_lock:
+            n_features = int(state["coef"].shape[1])
+
+            self.scaler.mean_ = state["scaler_mean"]
+            self.scaler.var_ = state["scaler_var"]
+            self.scaler.scale_ = state["scaler_scale"]
+            n = state["scaler_n"]
+            self.scaler.n_samples_seen_ = n if n.ndim else n[()]
+            self.scaler.n_features_in_ = n_features
+
+            self.model.coef_ = state["coef"]
+            self.model.intercept_ = state["intercept"]
+            self.model.classes_ = self._classes.copy()
+            self.model.t_ = float(state["t"])
+            self.model.n_iter_ = int(state["n_iter"])
+            self.model.n_features_in_ = n_features
+
+            self._seen = int(state["seen"])
+            self.is_fitted = True
+            self._compile()
+        return True
@@ -0,0 +1,126 @@
+import queue
+import threading
+import logging
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MLTrainer:
+    """
+    Treino do MLModel fora do caminho da ordem:
+    - record(features, outcome) só enfileira (não bloqueia quem chama).
+    - Uma thread junta as amostras novas em mini-lotes de batch_size, completando
+      o lote com amostras aleatórias do buffer de replay (limitado a buffer_size).
+    - O modelo publica os pesos compilados numa única atribuição, então a
+      inferência nunca espera o treino.
+    - Com fit_key(key, X, y, new) (ex.: ModelRegistry.partial_fit), amostras gravadas
+      com key treinam também o modelo daquela chave, com replay próprio (key_buffer_size).
+    """
+
+    def __init__(self, model, buffer_size: int = 2000, batch_size: int = 32, seed: int = 42,
+                 fit_key=None, key_buffer_size: int = 300):
+        self.model = model
+        self.fit_key = fit_key
+        self.batch_size = max(1, int(batch_size))
+        self.buffer_size = int(buffer_size)
+        self.key_buffer_size = int(key_buffer_size)
+        self._incoming = queue.Queue()
+        self._replay = {}
+        self._rng = np.random.default_rng(seed)
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.samples = 0
+
+    def record(self, features, outcome, key=None):
+        self._incoming.put((np.asarray(features, dtype=float).reshape(-1), int(outcome), key))
+
+    def pending(self):
+        return self._incoming.qsize()
+
+    def buffered(self, key=None):
+        replay = self._replay.get(key)
+        return len(replay[1]) if replay else 0
+
+    def start(self):
+        with self._lock:
+            self._running = True
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            # sentinela só com o worker vivo: sem ele, ficaria na fila e mataria o próximo start()
+            if self._thread is not None:
+                self._incoming.put(None)
+
+    # ------------------------------------------------------------------
+    def _drain(self, first):
+        items = [first]
+        while True:
+            try:
+                item = self._incoming.get_nowait()
+            except queue.Empty:
+                return items
+            if item is None:
+                continue  # stop(): o laço confere _running depois do lote
+            items.append(item)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    self._thread = None
+                    return
+            first = self._incoming.get()
+            if first is None:
+                continue
+            items = self._drain(first)
+            # o modelo global aprende com tudo; o da chave só com as suas amostras
+            groups = {None: items}
+            if self.fit_key is not None:
+                for item in items:
+                    if item[2] is not None:
+                        groups.setdefault(item[2], []).append(item)
+
+            for key, group in groups.items():
+                for i in range(0, len(group), self.batch_size):
+                    try:
+                        self._train(key, group[i:i + self.batch_size])
+                    except Exception as e:
+                        logger.error(f"Erro no treino do ML ({key or 'global'}): {e}")
+            self.samples += len(items)
+
+    def _train(self, key, chunk):
+        replay = self._replay.get(key)
+        if replay is None:
+            size = self.buffer_size if key is None else self.key_buffer_size
+            replay = self._replay[key] = (deque(maxlen=size), deque(maxlen=size))
+        replay_X, replay_y = replay
+
+        X_new = np.vstack([item[0] for item in chunk])
+        y_new = np.array([item[1] for item in chunk], dtype=int)
+
+        k = min(len(replay_y), self.batch_size - len(chunk))
+        if k > 0:
+            idx = self._rng.choice(len(replay_y), size=k, replace=False)
+            X = np.vstack([np.vstack([replay_X[i] for i in idx]), X_new])
+            y = np.concatenate([np.array([replay_y[i] for i in idx], dtype=int), y_new])
+        else:
+            X, y = X_new, y_new
+
+        # replay primeiro: as últimas len(chunk) linhas são as novas
+        if key is None:
+            self.model.partial_fit(X, y, new=len(chunk))
+        else:
+            self.fit_key(key, X, y, new=len(chunk))
+        replay_X.extend(X_new)
+        replay_y.extend(y_new)
+        self.batches += 1
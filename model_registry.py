@@ -0,0 +1,139 @@
+import os
+import re
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from ml_model import MLModel
+
+logger = logging.getLogger(__name__)
+
+
+def asset_cluster(asset: str) -> str:
+    return "otc" if "otc" in (asset or "").lower() else "regular"
+
+
+class ModelRegistry:
+    """
+    Modelos de ML especializados por ativo (key_mode="asset") ou por grupo
+    OTC/regular (key_mode="cluster"):
+    - Só o treino (partial_fit, no thread do trainer) cria, carrega do disco e
+      despeja modelos; a inferência só olha o que já está em memória e, se a
+      chave não tiver modelo pronto (warmup), usa o modelo global.
+    - No máximo max_models em memória (LRU): o menos usado é salvo em disco
+      (models_dir/<chave>.npz) e recarregado quando a chave volta a treinar.
+    """
+
+    def __init__(self, global_model, key_mode="cluster", max_models: int = 20,
+                 models_dir="ml_models", seed: int = 42, warmup: int = 30):
+        self.global_model = global_model
+        self.key_mode = key_mode
+        self.max_models = max(1, int(max_models))
+        self.models_dir = models_dir
+        self.seed = seed
+        self.warmup = int(warmup)
+        self._models = OrderedDict()
+        self._saved_seen = {}
+        self._lock = threading.Lock()
+        # serializa leitura/gravação em disco (treino e checkpoint), fora do _lock
+        # que a inferência usa: um load nunca lê pesos antigos de um save em curso
+        self._io_lock = threading.Lock()
+        self.evictions = 0
+        self.loads = 0
+
+    def key_for(self, asset):
+        if self.key_mode == "asset":
+            return asset
+        return asset_cluster(asset)
+
+    def _path(self, key):
+        if not self.models_dir:
+            return None
+        return os.path.join(self.models_dir, re.sub(r"[^A-Za-z0-9_-]", "_", key) + ".npz")
+
+    def get(self, key):
+        """Modelo da chave se estiver em memória (atualiza o LRU), senão None."""
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            return model
+
+    def partial_fit(self, key, X, y, new=None):
+        """Treina o modelo da chave, carregando do disco ou criando se preciso."""
+        with self._io_lock:
+            model = self.get(key)
+            if model is None:
+                model = MLModel(seed=self.seed, warmup=self.warmup)
+                path = self._path(key)
+                if path and os.path.exists(path) and model.load(path):
+                    self.loads += 1
+                    self._saved_seen[key] = model._seen
+                with self._lock:
+                    self._models[key] = model
+
+            model.partial_fit(X, y, new=new)
+
+            evicted = []
+            with self._lock:
+                self._models.move_to_end(key)
+                while len(self._models) > self.max_models:
+                    evicted.append(self._models.popitem(last=False))
+            for old_key, old_model in evicted:
+                self._save(old_key, old_model)
+                self.evictions += 1
+
+    def for_asset(self, asset):
+        """Modelo usado na inferência: o da chave se estiver em memória e pronto, senão o global."""
+        model = self.get(self.key_for(asset))
+        return model if model is not None and model.ready() else self.global_model
+
+    def predict_proba_batch(self, assets, X):
+        """
+        Probabilidades por linha, uma chamada por modelo distinto.
+        Retorna (probs, prontos): prontos[i] indica se o modelo usado já passou do warmup.
+        """
+        X = np.asarray(X, dtype=float)
+        probs = np.full(len(assets), 0.5)
+        ready = np.zeros(len(assets), dtype=bool)
+
+        groups = {}
+        for i, asset in enumerate(assets):
+            model = self.for_asset(asset)
+            groups.setdefault(id(model), (model, []))[1].append(i)
+        for model, rows in groups.values():
+            if model.ready():
+                probs[rows] = model.predict_proba_batch(X[rows])
+                ready[rows] = True
+        return probs, ready
+
+    # ------------------------------------------------------------------
+    def _save(self, key, model):
+        path = self._path(key)
+        if not path or model._seen == self._saved_seen.get(key, 0):
+            return
+        try:
+            os.makedirs(self.models_dir, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Erro criando {self.models_dir}: {e}")
+            return
+        if model.save(path):
+            self._saved_seen[key] = model._seen
+
+    def save_all(self):
+        with self._io_lock:
+            with self._lock:
+                items = list(self._models.items())
+            for key, model in items:
+                self._save(key, model)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "ready": sum(1 for m in self._models.values() if m.ready()),
+                "evictions": self.evictions,
+                "loads": self.loads,
+            }
@@ -0,0 +1,60 @@
+import math
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_many(fn, items, max_workers: int = 8, item_timeout: float = 10.0, deadline=None):
+    """
+    Executa fn(item) em paralelo com um pool limitado.
+    - Cada item tem item_timeout segundos a partir do momento em que começa.
+    - O total é limitado a item_timeout * ondas (itens / workers) e, se dado,
+      ao instante absoluto deadline (time.time()): o que ainda não terminou ou
+      nem começou até lá fica para trás.
+    - Retorna (resultados, atrasados): dict item -> resultado só com os que
+      terminaram a tempo (parcial) e a lista dos que ficaram para trás.
+    Exceções de um item são tratadas como falha daquele item apenas.
+    """
+    items = list(dict.fromkeys(items))
+    results = {}
+    if not items:
+        return results, []
+
+    workers = max(1, min(int(max_workers), len(items)))
+    budget = float(item_timeout) * math.ceil(len(items) / workers) + 0.5
+    started = {}
+
+    def run(item):
+        started[item] = time.time()
+        return fn(item)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch")
+    futures = {pool.submit(run, item): item for item in items}
+    pending = set(futures)
+    end = time.time() + budget
+    if deadline is not None:
+        end = min(end, float(deadline))
+    try:
+        while pending:
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=min(0.25, remaining), return_when=FIRST_COMPLETED)
+            for fut in done:
+                item = futures[fut]
+                try:
+                    results[item] = fut.result()
+                except Exception as e:
+                    logger.debug(f"Falha ao buscar {item}: {e}")
+
+            now = time.time()
+            expired = {f for f in pending
+                       if futures[f] in started and now - started[futures[f]] > item_timeout}
+            pending -= expired
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    late = [item for item in items if item not in results]
+    return results, late
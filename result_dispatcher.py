@@ -0,0 +1,137 @@
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def probe_binary(api, order_id):
+    """
+    Consulta única (não-bloqueante) do resultado binário/turbo no IQ_Option.
+    Retorna (finalizado, profit): profit > 0 WIN, < 0 LOSS, 0 empate.
+    """
+    # check_win_v4 bloqueia até o evento 'socket-option-closed' chegar: só chama
+    # depois dele. Sem o dicionário de eventos não há como saber sem bloquear,
+    # então a ordem segue pendente até o timeout de quem consulta.
+    closed = getattr(getattr(api, "api", None), "socket_option_closed", None)
+    if not isinstance(closed, dict) or closed.get(order_id) is None:
+        return False, None
+
+    result = api.check_win_v4(order_id)
+    if result is None:
+        return False, None
+
+    win_status, profit_amount = result
+    if win_status == 'equal':
+        return True, 0.0
+    if win_status in ('win', 'loose'):
+        return True, float(profit_amount) if profit_amount else 0.0
+    return False, None
+
+
+class _Pending:
+    __slots__ = ("order_id", "market", "not_before", "deadline", "future")
+
+    def __init__(self, order_id, market, not_before, deadline):
+        self.order_id = order_id
+        self.market = market
+        self.not_before = not_before
+        self.deadline = deadline
+        self.future = Future()
+
+
+class ResultDispatcher:
+    """
+    Liquidação central de ordens (substitui um laço de polling por ordem):
+    - Um único thread acompanha todas as ordens pendentes.
+    - Cada ordem só é consultada a partir do vencimento (not_before).
+    - probes[market](order_id) -> (done, profit) deve ser não-bloqueante.
+    - watch() devolve um Future com o profit (float) ou None em timeout.
+    - stop() cancela os Futures ainda pendentes: ordem abandonada, sem resultado
+      (diferente de timeout, não deve contar como perda).
+    """
+
+    def __init__(self, probes, poll_sec: float = 0.25):
+        self.probes = dict(probes)
+        self.poll_sec = float(poll_sec)
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._thread = None
+        self._running = False
+
+    def watch(self, order_id, market, timeout_sec=45, not_before=None):
+        now = time.time()
+        not_before = float(not_before) if not_before else now
+        item = _Pending(order_id, market, not_before, max(now, not_before) + float(timeout_sec))
+
+        with self._cond:
+            key = (market, order_id)
+            if key in self._pending:
+                return self._pending[key].future
+            self._pending[key] = item
+            self._ensure_thread()
+            self._cond.notify()
+        return item.future
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            items = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify()
+        for item in items:
+            item.future.cancel()
+
+    # ------------------------------------------------------------------
+    def _ensure_thread(self):
+        # chamado com o lock: o thread só se desliga (_thread = None) também com o lock,
+        # então um watch() logo depois de stop() nunca fica sem thread
+        self._running = True
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    self._thread = None
+                    return
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.time()
+                due = [p for p in self._pending.values() if p.not_before <= now]
+                if not due:
+                    wake = min(p.not_before for p in self._pending.values())
+                    self._cond.wait(max(0.0, wake - now))
+                    continue
+
+            done = []
+            for item in due:
+                profit = None
+                finished = False
+                probe = self.probes.get(item.market) or self.probes.get("binary")
+                try:
+                    finished, profit = probe(item.order_id)
+                except Exception as e:
+                    logger.debug(f"Erro consultando ordem {item.order_id}: {e}")
+                if finished:
+                    done.append((item, profit))
+                elif time.time() >= item.deadline:
+                    logger.warning(f"⏰ Timeout para order {item.order_id}")
+                    done.append((item, None))
+
+            with self._cond:
+                for item, _ in done:
+                    self._pending.pop((item.market, item.order_id), None)
+            for item, profit in done:
+                item.future.set_result(profit)
+
+            time.sleep(self.poll_sec)
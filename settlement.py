@@ -0,0 +1,136 @@
+import threading
+import time
+import logging
+
+from result_dispatcher import ResultDispatcher, probe_binary
+
+logger = logging.getLogger(__name__)
+
+
+class Entrada:
+    """Entrada aberta aguardando liquidação (tf = duração da ordem em segundos)."""
+
+    __slots__ = ("order_id", "ativo", "direcao", "stake", "payout", "vela_ts", "tf",
+                 "contexto", "fecha_em")
+
+    def __init__(self, order_id, ativo, direcao, stake, payout, vela_ts, tf, contexto):
+        self.order_id = order_id
+        self.ativo = ativo
+        self.direcao = direcao.lower()
+        self.stake = float(stake)
+        self.payout = float(payout)
+        self.vela_ts = int(vela_ts)
+        self.tf = int(tf)
+        self.contexto = contexto or {}
+        self.fecha_em = self.vela_ts + self.tf
+
+
+class TradeSettler:
+    """
+    Liquidação assíncrona das entradas dos painéis (uni.py / unico.py), sobre o
+    ResultDispatcher (um thread para todas as entradas):
+    - submit() registra a ordem e retorna na hora: o ciclo segue analisando.
+    - Cada entrada é consultada a partir do fechamento da vela dela: pelo
+      resultado da corretora (probe_binary) ou, passado broker_grace_sec, pela
+      própria vela (abertura x fechamento), como o verificar_resultado antigo.
+    - on_result(entrada, resultado, lucro) roda no thread do dispatcher;
+      resultado é 'win' | 'loss' | 'doji'.
+    - pendente(ativo) permite pular ativos com entrada em aberto.
+    - stop(drain=True) só encerra o thread depois de liquidar as entradas que já
+      estão abertas; stop() descarta as abertas sem chamar on_result.
+    Horários em hora do servidor (clock.now() se houver ClockSync).
+    """
+
+    def __init__(self, api, on_result, get_candles=None, clock=None, poll_sec: float = 0.5,
+                 broker_grace_sec: float = 5.0, timeout_sec: float = 30.0):
+        self.api = api
+        self.on_result = on_result
+        self.get_candles = get_candles or (lambda ativo, tf, n: api.get_candles(ativo, tf, n, time.time()))
+        self.clock = clock
+        self.broker_grace_sec = float(broker_grace_sec)
+        self.timeout_sec = float(timeout_sec)
+        self._lock = threading.Lock()
+        self._abertas = {}
+        self._draining = False
+        self._results = ResultDispatcher({"binary": self._probe}, poll_sec=poll_sec)
+
+    def _now(self):
+        return self.clock.now() if self.clock is not None else time.time()
+
+    def submit(self, order_id, ativo, direcao, stake, payout, vela_ts, tf=60, contexto=None):
+        entrada = Entrada(order_id, ativo, direcao, stake, payout, vela_ts, tf, contexto)
+        # o dispatcher trabalha no relógio local
+        local = time.time() - self._now()
+        with self._lock:
+            self._draining = False
+            self._abertas[order_id] = entrada
+            future = self._results.watch(order_id, "binary", not_before=entrada.fecha_em + local,
+                                         timeout_sec=self.timeout_sec)
+        future.add_done_callback(lambda f: self._done(entrada, f))
+        return entrada
+
+    def pendente(self, ativo=None):
+        with self._lock:
+            if ativo is None:
+                return len(self._abertas)
+            return any(e.ativo == ativo for e in self._abertas.values())
+
+    def stop(self, drain=False):
+        with self._lock:
+            if drain and self._abertas:
+                self._draining = True
+                return
+        # fora do lock: o cancelamento chama _done na hora
+        self._results.stop()
+
+    # ------------------------------------------------------------------
+    def _done(self, entrada, future):
+        with self._lock:
+            if self._abertas.get(entrada.order_id) is not entrada:
+                return
+            del self._abertas[entrada.order_id]
+            if self._draining and not self._abertas:
+                self._draining = False
+                self._results.stop()
+        if future.cancelled():
+            return
+
+        lucro = future.result()
+        if lucro is None:
+            # timeout: mesmo desfecho do verificar_resultado antigo sem vela
+            resultado, lucro = 'loss', -entrada.stake
+        elif lucro == 0:
+            resultado = 'doji'
+        else:
+            resultado = 'win' if lucro > 0 else 'loss'
+        try:
+            self.on_result(entrada, resultado, lucro)
+        except Exception as e:
+            logger.error(f"Erro no callback de resultado: {e}")
+
+    def _probe(self, order_id):
+        """(finalizado, lucro) para o dispatcher: corretora, depois a vela."""
+        with self._lock:
+            entrada = self._abertas.get(order_id)
+        if entrada is None:
+            return True, None
+        finished, lucro = probe_binary(self.api, order_id)
+        if finished:
+            return True, lucro
+        if self._now() < entrada.fecha_em + self.broker_grace_sec:
+            return False, None
+        return self._pela_vela(entrada)
+
+    def _pela_vela(self, entrada):
+        velas = self.get_candles(entrada.ativo, entrada.tf, 3) or []
+        vela = next((v for v in velas if v.get('from') == entrada.vela_ts), None)
+        if vela is None:
+            return False, None
+        abertura = float(vela['open'])
+        fechamento = float(vela['close'])
+        if fechamento == abertura:
+            return True, 0.0
+        subiu = fechamento > abertura
+        if subiu == (entrada.direcao == 'call'):
+            return True, round(entrada.stake * entrada.payout, 2)
+        return True, -entrada.stake
@@ -0,0 +1,534 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PAIRS = (
+    "EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCAD", "EURGBP", "EURJPY",
+    "GBPJPY", "AUDJPY", "GBPCHF", "EURCHF", "USDCHF", "NZDUSD", "AUDNZD",
+    "GBPNZD", "EURNZD", "EURCAD", "AUDCAD", "CADJPY", "CHFJPY", "NZDJPY",
+    "GBPAUD", "GBPCAD", "EURAUD", "AUDCHF", "CADCHF", "NZDCAD", "NZDCHF",
+)
+
+# oitavas do ruído de preço: (escala em segundos, peso)
+_OCTAVES = ((1800, 1.0), (300, 0.6), (60, 0.35), (15, 0.15))
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def default_assets(n=150):
+    """n nomes no formato da corretora: pares reais, os mesmos em OTC, depois SIMnnn."""
+    names = list(PAIRS) + [f"{p}-OTC" for p in PAIRS]
+    i = 1
+    while len(names) < n:
+        names.append(f"SIM{i:03d}-OTC" if i % 2 else f"SIM{i:03d}")
+        i += 1
+    return names[:n]
+
+
+def _unit(seed, k):
+    """Ruído determinístico em [-1, 1) por inteiro k (splitmix64)."""
+    with np.errstate(over="ignore"):
+        x = (np.asarray(k, dtype=np.int64).astype(np.uint64) + np.uint64(seed)) * _GOLDEN
+        x ^= x >> np.uint64(30)
+        x *= _MIX1
+        x ^= x >> np.uint64(27)
+        x *= _MIX2
+        x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(float) / 2.0 ** 53 * 2.0 - 1.0
+
+
+class _PricePath:
+    """
+    Preço de um ativo em função da hora (segundos inteiros), determinístico:
+    a mesma vela sai igual em get_candles, no stream e na liquidação.
+    - Sintético: ruído em oitavas (interpolado) sobre um preço base.
+    - Replay: velas gravadas expandidas para um preço por segundo (abertura,
+      mínima/máxima, fechamento) e repetidas em loop a partir da primeira vela.
+    """
+
+    __slots__ = ("seed", "base", "vol", "digits", "replay", "anchor")
+
+    def __init__(self, seed, base, vol, digits, replay=None):
+        self.seed = int(seed)
+        self.base = float(base)
+        self.vol = float(vol)
+        self.digits = int(digits)
+        self.replay = None
+        self.anchor = 0
+        if replay:
+            self._load_replay(replay)
+
+    def _load_replay(self, candles):
+        candles = sorted(candles, key=lambda c: c["from"])
+        dt = int(candles[1]["from"] - candles[0]["from"]) if len(candles) > 1 else 60
+        dt = max(3, dt)
+        a, b = dt // 3, 2 * dt // 3
+        parts = []
+        for c in candles:
+            o, cl = float(c["open"]), float(c["close"])
+            hi, lo = float(c.get("max", max(o, cl))), float(c.get("min", min(o, cl)))
+            # vela verde faz a mínima antes da máxima; vermelha, o contrário
+            p1, p2 = (lo, hi) if cl >= o else (hi, lo)
+            parts.append(np.concatenate([
+                np.linspace(o, p1, a, endpoint=False),
+                np.linspace(p1, p2, b - a, endpoint=False),
+                np.linspace(p2, cl, dt - b),
+            ]))
+        self.replay = np.concatenate(parts)
+        # alinhado à grade de dt: velas reproduzidas continuam começando no minuto cheio
+        self.anchor = int(candles[0]["from"]) // dt * dt
+
+    def prices(self, secs):
+        secs = np.asarray(secs, dtype=np.int64)
+        if self.replay is not None:
+            return np.round(self.replay[(secs - self.anchor) % len(self.replay)], self.digits)
+        noise = np.zeros(secs.shape, dtype=float)
+        for i, (scale, weight) in enumerate(_OCTAVES):
+            k, frac = np.divmod(secs, scale)
+            seed = self.seed * 31 + i
+            lo, hi = _unit(seed, k), _unit(seed, k + 1)
+            noise += weight * (lo + (hi - lo) * (frac / scale))
+        return np.round(self.base * np.exp(self.vol * noise), self.digits)
+
+    def price(self, ts):
+        return float(self.prices(np.array([int(ts)]))[0])
+
+
+class _SimOrder:
+    __slots__ = ("id", "asset", "amount", "direction", "market", "payout",
+                 "open_price", "opened_at", "expires_at")
+
+    def __init__(self, order_id, asset, amount, direction, market, payout, open_price, opened_at, expires_at):
+        self.id = order_id
+        self.asset = asset
+        self.amount = float(amount)
+        self.direction = direction
+        self.market = market
+        self.payout = float(payout)
+        self.open_price = open_price
+        self.opened_at = opened_at
+        self.expires_at = expires_at
+
+
+class _SimWebsocket:
+    """O pedaço de api.api (websocket do stable_api) que o bot lê diretamente."""
+
+    def __init__(self):
+        self.socket_option_closed = {}
+
+
+class SimBroker:
+    """
+    Corretora simulada, no lugar do IQ_Option do stable_api (mesmos nomes e
+    retornos), para testes de carga e latência sem rede:
+    - IQService(email, senha, api=SimBroker(...)); em uni.py/unico.py basta
+      construir SimBroker no lugar de IQ_Option (mesmo construtor).
+    - Velas sintéticas ou reproduzidas (replay={ativo: velas}); a última vela
+      de get_candles é a vela viva, como na corretora.
+    - latency_sec/jitter_sec/fail_rate: número ou dict por método (chave
+      "default" para o resto). Falhas devolvem o que a API devolve quando falha:
+      (False, msg) nas compras/connect e None nas consultas.
+    - Ordens liquidam no vencimento (+ settle_delay_sec): binárias preenchem
+      api.socket_option_closed (check_win_v4), digitais get_async_order e
+      check_win_digital_v2.
+      expiry_sec encurta o vencimento para benchmarks.
+    """
+
+    def __init__(self, email=None, password=None, assets=None, n_assets: int = 150,
+                 closed=(), payout_range=(0.70, 0.92), balance: float = 10000.0,
+                 latency_sec=0.0, jitter_sec=0.0, fail_rate=0.0,
+                 settle_delay_sec: float = 0.3, expiry_sec=None, server_offset_sec: float = 0.0,
+                 replay=None, seed: int = 42):
+        self.email = email
+        self.assets = list(assets) if assets else default_assets(n_assets)
+        self.latency_sec = latency_sec
+        self.jitter_sec = jitter_sec
+        self.fail_rate = fail_rate
+        self.settle_delay_sec = float(settle_delay_sec)
+        self.expiry_sec = expiry_sec
+        self.server_offset_sec = float(server_offset_sec)
+        self.api = _SimWebsocket()
+
+        rng = random.Random(seed)
+        replay = replay or {}
+        self._paths = {}
+        self._payouts = {}
+        for i, asset in enumerate(self.assets):
+            jpy = "JPY" in asset
+            self._paths[asset] = _PricePath(
+                seed * 1000 + i,
+                rng.uniform(80, 190) if jpy else rng.uniform(0.6, 1.9),
+                rng.uniform(0.001, 0.004),
+                3 if jpy else 5,
+                replay.get(asset),
+            )
+            self._payouts[asset] = round(rng.uniform(*payout_range), 2)
+        closed = set(closed)
+        self._open = {asset: asset not in closed for asset in self.assets}
+
+        self._rng = random.Random(seed + 1)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._connected = False
+        self._mode = "PRACTICE"
+        self._balances = {"PRACTICE": float(balance), "REAL": float(balance)}
+        self._ids = itertools.count(10 ** 10)
+        self._orders = {}
+        self._heap = []
+        self._digital_closed = {}
+        self._streams = {}
+        self._series_cache = {}
+        self._stats = {}
+        self.settled = 0
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _pick(value, method):
+        if isinstance(value, dict):
+            return float(value.get(method, value.get("default", 0.0)))
+        return float(value or 0.0)
+
+    def _call(self, method):
+        """Aplica a latência injetada; True se esta chamada deve falhar."""
+        with self._lock:
+            delay = self._pick(self.latency_sec, method)
+            jitter = self._pick(self.jitter_sec, method)
+            if jitter:
+                delay += self._rng.random() * jitter
+            fail = self._rng.random() < self._pick(self.fail_rate, method)
+            st = self._stats.setdefault(method, [0, 0, 0.0])
+            st[0] += 1
+            st[1] += fail
+            st[2] += delay
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def stats(self):
+        """Chamadas por método: {método: {calls, failures, avg_latency_ms}} + ordens."""
+        with self._lock:
+            out = {m: {"calls": c, "failures": f, "avg_latency_ms": (d / c * 1000.0) if c else 0.0}
+                   for m, (c, f, d) in self._stats.items()}
+            out["orders"] = {"open": len(self._orders), "settled": self.settled}
+        return out
+
+    def _now(self):
+        return time.time() + self.server_offset_sec
+
+    # ===================== Conexão / conta =====================
+    def connect(self):
+        if self._call("connect"):
+            return False, '{"code": "sim", "message": "falha de conexão simulada"}'
+        self._connected = True
+        self._ensure_thread()
+        return True, None
+
+    def check_connect(self):
+        return self._connected
+
+    def change_balance(self, balance_mode):
+        self._call("change_balance")
+        mode = str(balance_mode).upper()
+        with self._lock:
+            self._balances.setdefault(mode, 0.0)
+            self._mode = mode
+
+    def get_balance(self):
+        if self._call("get_balance"):
+            return None
+        with self._lock:
+            return round(self._balances[self._mode], 2)
+
+    def get_server_timestamp(self):
+        return round(self._now(), 3)
+
+    # ===================== Mercados =====================
+    def set_open(self, asset, is_open=True):
+        """Abre/fecha um ativo (para exercitar o universo de ativos)."""
+        self._open[asset] = bool(is_open)
+
+    def get_all_open_time(self):
+        if self._call("get_all_open_time"):
+            return None
+        markets = {}
+        for market in ("binary", "turbo", "digital"):
+            markets[market] = {asset: {"open": self._open[asset]} for asset in self.assets}
+        return markets
+
+    def get_all_profit(self):
+        if self._call("get_all_profit"):
+            return None
+        return {asset: {"turbo": p, "binary": p} for asset, p in self._payouts.items()}
+
+    def get_digital_current_profit(self, asset, duration):
+        if self._call("get_digital_current_profit") or asset not in self._payouts:
+            return None
+        return round(self._payouts[asset] * 100.0, 0)
+
+    # ===================== Velas =====================
+    def _candle(self, path, start, tf, end):
+        secs = np.arange(start, min(start + tf, int(end)) + 1)
+        p = path.prices(secs)
+        return {
+            "id": start // tf, "from": start, "at": int(end * 1e9), "to": start + tf,
+            "open": float(p[0]), "close": float(p[-1]),
+            "min": float(p.min()), "max": float(p.max()), "volume": len(secs),
+        }
+
+    def _closed_candles(self, asset, tf, live_start, count):
+        """As count velas fechadas antes de live_start (em cache até a vela virar)."""
+        key = (asset, tf)
+        cached = self._series_cache.get(key)
+        if cached is not None and cached[0] == live_start and len(cached[1]) >= count:
+            return cached[1][len(cached[1]) - count:]
+
+        path = self._paths[asset]
+        starts = live_start - tf * np.arange(count, 0, -1, dtype=np.int64)
+        grid = starts[:, None] + np.arange(tf + 1, dtype=np.int64)[None, :]
+        p = path.prices(grid)
+        lows, highs = p.min(axis=1), p.max(axis=1)
+        candles = [{
+            "id": int(s) // tf, "from": int(s), "at": int((s + tf) * 1e9), "to": int(s) + tf,
+            "open": float(p[i, 0]), "close": float(p[i, -1]),
+            "min": float(lows[i]), "max": float(highs[i]), "volume": tf + 1,
+        } for i, s in enumerate(starts)]
+        self._series_cache[key] = (live_start, candles)
+        return candles
+
+    def _series(self, asset, tf, count, end):
+        tf = max(1, int(tf))
+        count = max(1, int(count))
+        live_start = int(end // tf) * tf
+        closed = self._closed_candles(asset, tf, live_start, count - 1) if count > 1 else []
+        return closed + [self._candle(self._paths[asset], live_start, tf, end)]
+
+    def get_candles(self, ACTIVES, interval, count, endtime):
+        if self._call("get_candles"):
+            return None
+        if ACTIVES not in self._paths:
+            return []
+        end = min(float(endtime or self._now()), self._now())
+        return self._series(ACTIVES, interval, count, end)
+
+    def start_candles_stream(self, ACTIVE, size, maxdict):
+        self._call("start_candles_stream")
+        with self._lock:
+            self._streams[(ACTIVE, int(size))] = max(1, int(maxdict))
+
+    def stop_candles_stream(self, ACTIVE, size):
+        with self._lock:
+            self._streams.pop((ACTIVE, int(size)), None)
+
+    def get_realtime_candles(self, ACTIVE, size):
+        maxdict = self._streams.get((ACTIVE, int(size)))
+        if maxdict is None or ACTIVE not in self._paths:
+            return {}
+        return {c["from"]: c for c in self._series(ACTIVE, size, maxdict, self._now())}
+
+    # ===================== Ordens =====================
+    def _expiration(self, now, duration_min):
+        if self.expiry_sec:
+            return now + float(self.expiry_sec)
+        # mesma regra do stable_api: com menos de 30 s para o minuto, vence no seguinte
+        exp = (int(now // 60) + 1) * 60
+        if exp - now < 30:
+            exp += 60
+        return exp + (max(1, int(duration_min)) - 1) * 60
+
+    def _open_order(self, method, asset, amount, direction, duration_min, market):
+        if self._call(method):
+            return False, "falha simulada"
+        direction = str(direction).lower()
+        if not self._connected:
+            return False, "não conectado"
+        if asset not in self._paths or not self._open.get(asset):
+            return False, f"ativo fechado: {asset}"
+        if direction not in ("call", "put"):
+            return False, f"direção inválida: {direction}"
+
+        now = self._now()
+        amount = float(amount)
+        with self._cond:
+            if self._balances[self._mode] < amount:
+                return False, "saldo insuficiente"
+            self._balances[self._mode] -= amount
+            order = _SimOrder(next(self._ids), asset, amount, direction, market, self._payouts[asset],
+                              self._paths[asset].price(now), now, self._expiration(now, duration_min))
+            self._orders[order.id] = order
+            heapq.heappush(self._heap, (order.expires_at, order.id))
+            self._ensure_thread()
+            self._cond.notify()
+        return True, order.id
+
+    def buy(self, price, ACTIVES, ACTION, expirations):
+        return self._open_order("buy", ACTIVES, price, ACTION, expirations, "binary")
+
+    def buy_digital_spot(self, active, amount, action, duration):
+        return self._open_order("buy_digital_spot", active, amount, action, duration, "digital")
+
+    def check_win_v4(self, id_number):
+        """Bloqueia até o evento de fechamento, como no stable_api."""
+        self._call("check_win_v4")
+        with self._cond:
+            while self.api.socket_option_closed.get(id_number) is None:
+                self._cond.wait(0.5)
+            msg = self.api.socket_option_closed[id_number]["msg"]
+        if msg["win"] == "equal":
+            return msg["win"], 0
+        if msg["win"] == "loose":
+            return msg["win"], -float(msg["sum"])
+        return msg["win"], float(msg["win_amount"]) - float(msg["sum"])
+
+    def get_async_order(self, buy_order_id):
+        """Eventos da ordem digital: 'position-changed' só existe depois de fechar."""
+        with self._lock:
+            profit = self._digital_closed.get(buy_order_id)
+        if profit is None:
+            return {"position-changed": {}}
+        return {"position-changed": {"msg": {"id": buy_order_id, "status": "closed", "pnl_net": profit}}}
+
+    def check_win_digital_v2(self, buy_order_id):
+        if self._call("check_win_digital_v2"):
+            return False, None
+        with self._lock:
+            profit = self._digital_closed.get(buy_order_id)
+        if profit is None:
+            return False, None
+        return True, profit
+
+    # ------------------------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._settle_loop, daemon=True)
+        self._thread.start()
+
+    def _settle_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due = self._heap[0][0] + self.settle_delay_sec
+                wait = due - self._now()
+                if wait > 0:
+                    self._cond.wait(min(wait, 1.0))
+                    continue
+                _, order_id = heapq.heappop(self._heap)
+                order = self._orders.pop(order_id, None)
+            if order is not None:
+                self._settle(order)
+
+    def _settle(self, order):
+        close = self._paths[order.asset].price(order.expires_at)
+        if close == order.open_price:
+            # binária devolve o valor; digital no strike perde
+            win = "equal" if order.market == "binary" else "loose"
+        else:
+            win = "win" if (close > order.open_price) == (order.direction == "call") else "loose"
+
+        if win == "win":
+            returned = round(order.amount * (1.0 + order.payout), 2)
+        elif win == "equal":
+            returned = order.amount
+        else:
+            returned = 0.0
+
+        with self._cond:
+            self._balances[self._mode] += returned
+            if order.market == "digital":
+                self._digital_closed[order.id] = round(returned - order.amount, 2)
+            else:
+                self.api.socket_option_closed[order.id] = {"msg": {
+                    "id": order.id, "active": order.asset, "direction": order.direction,
+                    "win": win, "sum": order.amount, "win_amount": returned,
+                    "value": close, "open_value": order.open_price,
+                    "expires_at": order.expires_at,
+                }}
+            self.settled += 1
+            self._cond.notify_all()
+
+
+# ===================== Benchmark =====================
+def _bench(args):
+    import tempfile
+    from bot_engine import BotEngine
+    from iq_service import IQService
+
+    sim = SimBroker(n_assets=args.assets, latency_sec=args.latency, jitter_sec=args.jitter,
+                    fail_rate=args.fail, expiry_sec=args.expiry)
+    service = IQService("sim@local", "", api=sim)
+    if not service.connect():
+        print("Falha ao conectar no simulador")
+        return
+    service.payouts.refresh()
+    service.markets.refresh()
+
+    t0 = time.perf_counter()
+    assets = service.get_turbo_assets()
+    print(f"ativos abertos: {len(assets)} em {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    tmp = tempfile.mkdtemp(prefix="simbench_")
+    bot = BotEngine(service, {
+        "watchlist_size": args.assets, "min_payout": 0, "max_concurrent": 0,
+        "candle_count": 90, "fetch_concurrency": 8,
+        "ml_path": f"{tmp}/ml.npz", "ml_models_dir": tmp,
+    })
+    bot._log = lambda msg: None
+    bot.running = True
+    for cycle in range(args.cycles):
+        bot._watchlist_ts = 0
+        t0 = time.perf_counter()
+        watch = bot._refresh_watchlist(assets)
+        t_watch = (time.perf_counter() - t0) * 1000.0
+        # janela real: a avaliação começa last_seconds antes do fechamento
+        bot._evaluate_cycle(watch, service.clock.now() + bot.eval_lead_sec)
+        c = bot.last_cycle
+        print(f"ciclo {cycle + 1}: watchlist {len(watch)} em {t_watch:.0f} ms | "
+              f"avaliação {c['eval_ms']:.0f} ms ({c['evaluated']} avaliados, "
+              f"{c['signals']} sinais, {c['missed']} perdidos, {c['capped']} cortados)")
+    bot.running = False
+
+    before = sim.get_balance()
+    t0 = time.perf_counter()
+    futures = []
+    for i in range(args.orders):
+        asset = assets[i % len(assets)]
+        ok, order_id, market, err = service.buy_best(asset, 2, "call" if i % 2 else "put", 1,
+                                                     prefer=("turbo", "digital"))
+        if ok:
+            futures.append(service.watch_result(order_id, market, timeout_sec=30))
+    t_buy = (time.perf_counter() - t0) * 1000.0
+    profits = [f.result() for f in futures]
+    settled = [p for p in profits if p is not None]
+    after = sim.get_balance()
+    print(f"ordens: {len(futures)}/{args.orders} em {t_buy:.0f} ms | liquidadas {len(settled)} | "
+          f"lucro {sum(settled):+.2f} | saldo {before:.2f} -> {after:.2f}")
+    print(f"rtt médio das ordens: {service.clock.stats()['rtt_ms']:.1f} ms")
+    for method, st in sorted(sim.stats().items()):
+        print(f"  {method}: {st}")
+    service.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark do bot contra a corretora simulada")
+    parser.add_argument("--assets", type=int, default=150)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--fail", type=float, default=0.0)
+    parser.add_argument("--expiry", type=float, default=3.0)
+    logging.basicConfig(level=logging.WARNING)
+    _bench(parser.parse_args())
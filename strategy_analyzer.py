@@ -18,30 +18,23 @@ class StrategyAnalyzer:
     """
     Analisador leve (sem promessas):
     - Analisa candles + payout e sugere direção/confiança.
-    - Mantém histórico por ativo/estratégia/timeframe (record_test_result).
+    - Mantém histórico por ativo/estratégia/timeframe (record_test_result); com um
+      TradeJournal, o histórico é gravado nele e reconstruído na inicialização.
     - Retorna confiança mínima por perfil.
     """
 
-    def __init__(self, iq_service):
+    def __init__(self, iq_service, journal=None):
         self.iq = iq_service
+        self.journal = journal
         self.strategy_results = {}
         self.last_analysis = {}
         self.analysis_count = 0
+        if journal is not None:
+            self._load_history()
 
     # -----------------------------
     # Helpers numéricos
     # -----------------------------
-    @staticmethod
-    def _ema(values, period: int):
-        if not values or len(values) < period:
-            return None
-        values = np.asarray(values, dtype=float)
-        alpha = 2.0 / (period + 1.0)
-        ema = [values[0]]
-        for v in values[1:]:
-            ema.append((v - ema[-1]) * alpha + ema[-1])
-        return np.asarray(ema, dtype=float)
-
     @staticmethod
     def _safe_closes(candles):
         closes = []
@@ -81,11 +74,7 @@ class StrategyAnalyzer:
         if len(closes) < 30:
             return 0.5, NEUTRAL
 
-        ema_fast = self._ema(closes, 10)
-        ema_slow = self._ema(closes, 20)
-        if ema_fast is None or ema_slow is None:
-            return 0.5, NEUTRAL
-
+        # (as EMAs 10/20 só eram checadas contra None; com >= 30 velas sempre existem)
         tail = closes[-6:]
         if len(tail) >= 2 and tail[-1] > tail[0]:
             trend = UP
@@ -222,6 +211,21 @@ class StrategyAnalyzer:
         self.strategy_results[key]["last_payout"] = payout
         self.strategy_results[key]["last_update"] = time.time()
 
+        if self.journal is not None:
+            self.journal.record("analyzer", asset, result, strategy=strategy,
+                                timeframe=timeframe_label, payout=payout)
+
+    def _load_history(self):
+        try:
+            rows = self.journal.totals_by("asset", "strategy", "timeframe", source="analyzer")
+        except Exception:
+            return
+        for asset, strategy, tf, wins, _losses, total, _profit, last_ts in rows:
+            self.strategy_results[f"{asset}_{strategy}_{tf}"] = {
+                "wins": int(wins), "losses": int(total - wins), "total": int(total),
+                "last_payout": None, "last_update": float(last_ts or 0),
+            }
+
     def get_best_strategy_for_asset(self, asset):
         best = None
         best_score = -1
@@ -0,0 +1,137 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TradeExecutor:
+    """
+    Execução limitada de trades (número de threads fixo, não cresce com os sinais):
+    - Pool fixo de workers para o trabalho de rede (compra).
+    - Fila de timers (heap + 1 thread) para as esperas, ex.: início do candle.
+    - Métricas: profundidade da fila, timers agendados, espera na fila e atraso do timer.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, int(max_workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="trade")
+        self._cond = threading.Condition()
+        self._timers = []
+        self._seq = itertools.count()
+        self._timer_thread = None
+        self._running = True
+
+        self._mlock = threading.Lock()
+        self._queued = 0
+        self._running_tasks = 0
+        self._completed = 0
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self._late_sum = 0.0
+        self._late_max = 0.0
+        self._fired = 0
+
+    # ------------------------------------------------------------------
+    def submit(self, fn, *args):
+        enqueued = time.time()
+        with self._mlock:
+            self._queued += 1
+        try:
+            return self._pool.submit(self._run, enqueued, fn, args)
+        except RuntimeError:
+            # pool já desligado (shutdown)
+            with self._mlock:
+                self._queued -= 1
+            raise
+
+    def schedule_at(self, ts, fn, *args):
+        """
+        Executa fn(*args) no pool quando time.time() >= ts.
+        Retorna False (sem agendar) depois do shutdown.
+        """
+        with self._cond:
+            if not self._running:
+                return False
+            heapq.heappush(self._timers, (float(ts), next(self._seq), fn, args))
+            self._ensure_timer_thread()
+            self._cond.notify()
+        return True
+
+    def metrics(self):
+        with self._cond:
+            scheduled = len(self._timers)
+        with self._mlock:
+            done = max(1, self._completed)
+            fired = max(1, self._fired)
+            return {
+                "workers": self.max_workers,
+                "scheduled": scheduled,
+                "queued": self._queued,
+                "running": self._running_tasks,
+                "completed": self._completed,
+                "avg_wait_ms": self._wait_sum / done * 1000.0,
+                "max_wait_ms": self._wait_max * 1000.0,
+                "avg_late_ms": self._late_sum / fired * 1000.0,
+                "max_late_ms": self._late_max * 1000.0,
+            }
+
+    def shutdown(self):
+        """Para timers e pool; devolve os (fn, args) agendados que não chegaram a rodar."""
+        with self._cond:
+            self._running = False
+            dropped = [(fn, args) for _, _, fn, args in self._timers]
+            self._timers.clear()
+            self._cond.notify()
+        self._pool.shutdown(wait=False)
+        return dropped
+
+    # ------------------------------------------------------------------
+    def _run(self, enqueued, fn, args):
+        waited = time.time() - enqueued
+        with self._mlock:
+            self._queued -= 1
+            self._running_tasks += 1
+            self._wait_sum += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            return fn(*args)
+        except Exception as e:
+            logger.error(f"Erro em tarefa de trade: {e}")
+        finally:
+            with self._mlock:
+                self._running_tasks -= 1
+                self._completed += 1
+
+    def _ensure_timer_thread(self):
+        if self._timer_thread and self._timer_thread.is_alive():
+            return
+        self._timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
+        self._timer_thread.start()
+
+    def _timer_loop(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._timers:
+                    self._cond.wait()
+                    continue
+                ts = self._timers[0][0]
+                now = time.time()
+                if ts > now:
+                    self._cond.wait(ts - now)
+                    continue
+                _, _, fn, args = heapq.heappop(self._timers)
+                # entrega ao pool ainda com o lock: o shutdown ou devolve a tarefa
+                # entre as descartadas, ou ela já está no pool e roda
+                self.submit(fn, *args)
+
+            late = max(0.0, time.time() - ts)
+            with self._mlock:
+                self._fired += 1
+                self._late_sum += late
+                self._late_max = max(self._late_max, late)
@@ -0,0 +1,162 @@
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    order_id TEXT,
+    asset TEXT NOT NULL,
+    strategy TEXT,
+    timeframe TEXT,
+    direction TEXT,
+    result TEXT NOT NULL,
+    profit REAL DEFAULT 0,
+    stake REAL,
+    payout REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_asset_ts ON trades (asset, ts);
+CREATE INDEX IF NOT EXISTS idx_trades_strategy_ts ON trades (strategy, ts);
+CREATE INDEX IF NOT EXISTS idx_trades_timeframe_ts ON trades (timeframe, ts);
+CREATE INDEX IF NOT EXISTS idx_trades_source_ts ON trades (source, ts);
+"""
+
+COLUMNS = ("ts", "source", "order_id", "asset", "strategy", "timeframe",
+           "direction", "result", "profit", "stake", "payout")
+
+GROUPABLE = ("source", "asset", "strategy", "timeframe", "direction")
+
+
+def _num(value):
+    """float de números ou textos da GUI ("R$ 2.00", "85%", "+1,70"); None se não der."""
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else float(value)
+    txt = str(value).replace("R$", "").replace("%", "").replace(",", ".").strip()
+    try:
+        return float(txt)
+    except ValueError:
+        return None
+
+
+class TradeJournal:
+    """
+    Diário de trades durável (SQLite em modo WAL), só de inserção:
+    - record() apenas enfileira; um thread grava em lotes (uma transação por lote),
+      fora do thread de trading/GUI.
+    - Índices por ativo, estratégia, timeframe e origem, todos com o horário.
+    - totals_by() agrega direto no SQLite para reconstruir estatísticas no início.
+    """
+
+    def __init__(self, path="trades.db", batch_size: int = 200, flush_sec: float = 1.0):
+        self.path = str(path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_sec = float(flush_sec)
+        self._queue = queue.Queue()
+        self._running = True
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------
+    def record(self, source, asset, result, strategy=None, timeframe=None, direction=None,
+               profit=0.0, stake=None, payout=None, order_id=None, ts=None):
+        row = (
+            float(ts) if ts is not None else time.time(),
+            str(source),
+            str(order_id) if order_id is not None else None,
+            str(asset),
+            str(strategy) if strategy is not None else None,
+            str(timeframe) if timeframe is not None else None,
+            str(direction).upper() if direction else None,
+            str(result).upper(),
+            _num(profit) or 0.0,
+            _num(stake),
+            _num(payout),
+        )
+        self._queue.put(row)
+
+    def flush(self):
+        """Bloqueia até o que já foi enfileirado estar gravado."""
+        self._queue.join()
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def totals_by(self, *columns, source=None, since=None):
+        """
+        Agregados por colunas, na ordem do primeiro trade de cada grupo:
+        [(col..., wins, losses, total, profit, ultimo_ts), ...]
+        """
+        for col in columns:
+            if col not in GROUPABLE:
+                raise ValueError(f"coluna inválida: {col}")
+        cols = ", ".join(columns)
+        where, params = [], []
+        if source is not None:
+            where.append("source = ?")
+            params.append(source)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(float(since))
+        sql = (f"SELECT {cols + ', ' if cols else ''}"
+               "SUM(result = 'WIN'), SUM(result = 'LOSS'), COUNT(*), SUM(profit), MAX(ts) "
+               "FROM trades"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + (f" GROUP BY {cols} ORDER BY MIN(id)" if cols else ""))
+        with self._connect() as conn:
+            return [tuple(r) for r in conn.execute(sql, params) if r[-3]]
+
+    # ------------------------------------------------------------------
+    def _writer(self):
+        conn = self._connect()
+        sql = f"INSERT INTO trades ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_sec)
+                except queue.Empty:
+                    continue
+                batch, stop = [], item is None
+                if not stop:
+                    batch.append(item)
+                while len(batch) < self.batch_size and not stop:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                    else:
+                        batch.append(item)
+
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(sql, batch)
+                    except sqlite3.Error as e:
+                        logger.error(f"Erro gravando {len(batch)} trades: {e}")
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
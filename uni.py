@@ -7,7 +7,6 @@ import sys
 from iqoptionapi.stable_api import IQ_Option
 from collections import defaultdict
 from datetime import datetime
-import pandas as pd
 import queue
 from typing import Optional, List, Dict
 from PIL import Image, ImageDraw, ImageFont
@@ -15,6 +14,16 @@ import io
 import numpy as np
 import random
 
+from asset_universe import AssetUniverse
+from candle_frame import CandleFrame
+from candle_timer import CandleTimer
+from clock_sync import ClockSync
+from indicators import IndicatorEngine
+from market_snapshot import OpenMarketsSnapshot
+from parallel_fetch import fetch_many
+from settlement import TradeSettler
+from trade_journal import TradeJournal
+
 # Configurar encoding
 if sys.platform.startswith("win"):
     try:
@@ -281,70 +290,163 @@ class RealTimeLogger:
 # GERENCIADOR DE PERFORMANCE
 # =========================================
 class PerformanceTracker:
-    def __init__(self):
-        self.stats = {}
-        self.ultima_atualizacao = time.time()
-    
-    def registrar_resultado(self, ativo, estrategia, resultado):
-        if ativo not in self.stats:
-            self.stats[ativo] = {}
-        
-        if estrategia not in self.stats[ativo]:
-            self.stats[ativo][estrategia] = {'wins': 0, 'losses': 0, 'total': 0}
-        
-        if resultado == 'win':
-            self.stats[ativo][estrategia]['wins'] += 1
-        elif resultado == 'loss':
-            self.stats[ativo][estrategia]['losses'] += 1
-        
-        self.stats[ativo][estrategia]['total'] += 1
+    """
+    Contadores por (ativo, estratégia) em arrays NumPy:
+    - registrar_resultado() atualiza wins/losses/total e a taxa da linha em O(1).
+    - Rankings (tabela e melhores ativos) ficam em cache até um contador mudar.
+    - get_tabela_dados(limite=N) só formata as N linhas exibidas.
+    - Com um TradeJournal (diario), cada resultado é gravado nele e os contadores
+      são reconstruídos na inicialização com uma agregação no SQLite.
+    """
+
+    def __init__(self, capacidade=64, diario=None):
+        self._lock = threading.Lock()
+        self._linhas = {}
+        self._ativo_linha = []
+        self._estrategia_linha = []
+        self._ativos = {}
+        self._wins = np.zeros(capacidade, dtype=np.int64)
+        self._losses = np.zeros(capacidade, dtype=np.int64)
+        self._total = np.zeros(capacidade, dtype=np.int64)
+        self._taxa = np.zeros(capacidade, dtype=float)
+        self._ativo_idx = np.zeros(capacidade, dtype=np.int64)
+        self._a_wins = np.zeros(capacidade, dtype=np.int64)
+        self._a_total = np.zeros(capacidade, dtype=np.int64)
+        self._versao = 0
+        self._cache = {}
         self.ultima_atualizacao = time.time()
-    
+        self.diario = diario
+        if diario is not None:
+            self._carregar()
+
+    def _carregar(self):
+        try:
+            linhas = self.diario.totals_by('asset', 'strategy', source='uni')
+        except Exception as e:
+            logging.warning(f"Diário de trades indisponível: {e}")
+            return
+        with self._lock:
+            for ativo, estrategia, wins, losses, total, _lucro, _ts in linhas:
+                linha = self._linha(ativo, estrategia)
+                a = self._ativos[ativo]
+                self._wins[linha] = wins
+                self._losses[linha] = losses
+                self._total[linha] = total
+                self._taxa[linha] = wins / total * 100
+                self._a_wins[a] += wins
+                self._a_total[a] += total
+            self._versao += 1
+
+    def _crescer(self, n):
+        for nome in ('_wins', '_losses', '_total', '_taxa', '_ativo_idx', '_a_wins', '_a_total'):
+            atual = getattr(self, nome)
+            if len(atual) < n:
+                maior = np.zeros(max(n, len(atual) * 2), dtype=atual.dtype)
+                maior[:len(atual)] = atual
+                setattr(self, nome, maior)
+
+    def _linha(self, ativo, estrategia):
+        chave = (ativo, estrategia)
+        linha = self._linhas.get(chave)
+        if linha is None:
+            if ativo not in self._ativos:
+                self._ativos[ativo] = len(self._ativos)
+            linha = len(self._linhas)
+            self._crescer(max(linha, len(self._ativos)) + 1)
+            self._linhas[chave] = linha
+            self._ativo_linha.append(ativo)
+            self._estrategia_linha.append(estrategia)
+            self._ativo_idx[linha] = self._ativos[ativo]
+        return linha
+
+    def registrar_resultado(self, ativo, estrategia, resultado, **detalhes):
+        """detalhes (direction, profit, stake, payout, order_id, timeframe) vão só para o diário."""
+        with self._lock:
+            linha = self._linha(ativo, estrategia)
+            a = self._ativos[ativo]
+
+            if resultado == 'win':
+                self._wins[linha] += 1
+                self._a_wins[a] += 1
+            elif resultado == 'loss':
+                self._losses[linha] += 1
+
+            self._total[linha] += 1
+            self._a_total[a] += 1
+            self._taxa[linha] = self._wins[linha] / self._total[linha] * 100
+            self._versao += 1
+            self.ultima_atualizacao = time.time()
+
+        if self.diario is not None:
+            self.diario.record('uni', ativo, resultado, strategy=estrategia, **detalhes)
+
+    @property
+    def stats(self):
+        """Visão em dicionário {ativo: {estrategia: {wins, losses, total}}}."""
+        with self._lock:
+            dados = {}
+            for (ativo, estrategia), linha in self._linhas.items():
+                dados.setdefault(ativo, {})[estrategia] = {
+                    'wins': int(self._wins[linha]),
+                    'losses': int(self._losses[linha]),
+                    'total': int(self._total[linha]),
+                }
+            return dados
+
     def get_assertividade(self, ativo, estrategia):
-        if ativo in self.stats and estrategia in self.stats[ativo]:
-            stats = self.stats[ativo][estrategia]
-            if stats['total'] > 0:
-                return (stats['wins'] / stats['total'] * 100)
+        with self._lock:
+            linha = self._linhas.get((ativo, estrategia))
+            if linha is not None and self._total[linha] > 0:
+                return float(self._taxa[linha])
         return 0
-    
-    def get_tabela_dados(self, ativos_filtro=None):
-        dados = []
-        
-        for ativo in self.stats:
-            if ativos_filtro and ativo not in ativos_filtro:
-                continue
-                
-            for estrategia, stats in self.stats[ativo].items():
-                if stats['total'] > 0:
-                    assertividade = (stats['wins'] / stats['total'] * 100)
-                    dados.append([
-                        ativo,
-                        estrategia,
-                        f"{assertividade:.1f}%",
-                        str(stats['total']),
-                        stats['wins'],
-                        stats['losses']
-                    ])
-        
-        dados.sort(key=lambda x: float(x[2].replace('%', '')), reverse=True)
-        return dados
+
+    def _ranking(self):
+        """Linhas com trades, da maior taxa para a menor (em cache por versão)."""
+        cache = self._cache.get('ranking')
+        if cache is not None and cache[0] == self._versao:
+            return cache[1]
+        n = len(self._linhas)
+        linhas = np.flatnonzero(self._total[:n] > 0)
+        # mesma ordem da tabela antiga: taxa exibida (1 casa), depois ativo e estratégia na ordem de chegada
+        ordem = np.lexsort((linhas, self._ativo_idx[linhas], -np.round(self._taxa[linhas], 1)))
+        ranking = linhas[ordem]
+        self._cache['ranking'] = (self._versao, ranking)
+        return ranking
+
+    def get_tabela_dados(self, ativos_filtro=None, limite=None):
+        with self._lock:
+            ranking = self._ranking()
+            if ativos_filtro:
+                filtro = set(ativos_filtro)
+                ranking = [l for l in ranking if self._ativo_linha[l] in filtro]
+            if limite is not None:
+                ranking = ranking[:limite]
+
+            return [[
+                self._ativo_linha[l],
+                self._estrategia_linha[l],
+                f"{self._taxa[l]:.1f}%",
+                str(int(self._total[l])),
+                int(self._wins[l]),
+                int(self._losses[l]),
+            ] for l in ranking]
     
     def get_melhores_ativos(self, limite=5):
-        performance_ativos = {}
-        
-        for ativo in self.stats:
-            total_wins = 0
-            total_trades = 0
-            
-            for estrategia, stats in self.stats[ativo].items():
-                total_wins += stats['wins']
-                total_trades += stats['total']
-            
-            if total_trades >= 3:
-                performance_ativos[ativo] = (total_wins / total_trades * 100, total_trades)
-        
-        melhores = sorted(performance_ativos.items(), key=lambda x: x[1][0], reverse=True)
-        return [ativo for ativo, _ in melhores[:limite]]
+        with self._lock:
+            chave = ('melhores', limite)
+            cache = self._cache.get(chave)
+            if cache is not None and cache[0] == self._versao:
+                return list(cache[1])
+
+            n = len(self._ativos)
+            nomes = list(self._ativos)
+            total = self._a_total[:n]
+            idx = np.flatnonzero(total >= 3)
+            taxa = self._a_wins[idx] / total[idx] * 100
+            melhores = [nomes[i] for i in idx[np.argsort(-taxa, kind='stable')][:limite]]
+
+            self._cache[chave] = (self._versao, melhores)
+            return list(melhores)
 
 
 # =========================================
@@ -417,6 +519,17 @@ class SorosGale:
         }
 
 
+# =========================================
+# VELAS DAS ESTRATÉGIAS
+# =========================================
+def obter_velas(api, ativo, tf_segundos, lookback, candles=None):
+    """Velas da estratégia: recorte do snapshot do ciclo ou, avulso, busca própria."""
+    if candles is not None:
+        return candles.tail(lookback)
+    brutas = api.get_candles(ativo, tf_segundos, lookback, time.time())
+    return CandleFrame(brutas) if brutas else None
+
+
 # =========================================
 # ESTRATÉGIA: TENDÊNCIA POR VELAS
 # =========================================
@@ -425,6 +538,7 @@ class StrategyTendencia:
         self.api = api
         self.logger = logger
         self.nome = "Tendencia"
+        self.lookback = 30
         self.last_signal_time = {}
         
     def get_color(self, candle):
@@ -468,17 +582,17 @@ class StrategyTendencia:
         
         return None, 0
     
-    def analisar(self, ativo, tf_segundos):
+    def analisar(self, ativo, tf_segundos, candles=None):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 30, time.time())
-            if not candles or len(candles) < 10:
+            velas = obter_velas(self.api, ativo, tf_segundos, self.lookback, candles)
+            if not velas or len(velas) < 10:
                 return None, "WAIT"
             
             now = time.time()
             if ativo in self.last_signal_time and now - self.last_signal_time[ativo] < 60:
                 return None, "COOLDOWN"
             
-            direcao, confianca = self.analisar_tendencia(candles)
+            direcao, confianca = self.analisar_tendencia(velas.candles)
             
             if direcao:
                 self.last_signal_time[ativo] = now
@@ -499,49 +613,61 @@ class StrategyCiclos:
         self.api = api
         self.logger = logger
         self.nome = "Ciclos"
+        self.lookback = 120
         self.last_pattern = {}
         self.last_signal_time = {}
+        self._padrao_cache = {}
 
-    def get_color(self, candle):
-        if candle['close'] > candle['open']: return 1
-        if candle['close'] < candle['open']: return -1
-        return 0
-
-    def analisar(self, ativo, tf_segundos):
+    @staticmethod
+    def buscar_padrao(cores):
+        """
+        Padrão AZUL/ROSA mais recente entre as velas fechadas (a última é a ao vivo).
+        Mesma busca do laço antigo (i = 2..min(n-5, 100)), feita com views deslocadas.
+        """
+        n = len(cores)
+        limite = min(n - 5, 100)
+        if limite <= 2:
+            return None
+        lo, hi = n - limite + 1, n - 1
+        h0 = cores[lo:hi]
+        h1 = cores[lo - 1:hi - 1]
+        h2 = cores[lo - 2:hi - 2]
+        h3 = cores[lo - 3:hi - 3]
+
+        base = (h0 != 0) & (h1 != 0) & (h2 != 0) & (h3 != 0) & (h3 != h2) & (h2 == h1)
+        azul = base & (h1 == h0)
+        rosa = base & (h1 != h0) & (h0 == h3)
+        achados = np.flatnonzero(azul | rosa)
+        if not achados.size:
+            return None
+        # o laço começava pela vela mais recente: o último achado vence
+        return 'AZUL' if azul[achados[-1]] else 'ROSA'
+
+    def _padrao_cacheado(self, ativo, velas):
+        # a busca só olha velas fechadas: muda apenas quando abre uma vela nova
+        chave = velas.candles[-1].get('from')
+        cache = self._padrao_cache.get(ativo)
+        if cache is not None and chave is not None and cache[0] == chave:
+            return cache[1]
+        padrao = self.buscar_padrao(velas.cores)
+        self._padrao_cache[ativo] = (chave, padrao)
+        return padrao
+
+    def analisar(self, ativo, tf_segundos, candles=None):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 120, time.time())
-            if not candles or len(candles) < 20:
+            velas = obter_velas(self.api, ativo, tf_segundos, self.lookback, candles)
+            if not velas or len(velas) < 20:
                 return None, "WAIT"
             
-            df = pd.DataFrame(candles)
-            
-            current_pattern = None
-            for i in range(2, min(len(df) - 5, 100)): 
-                idx0, idx1, idx2, idx3 = -i, -i-1, -i-2, -i-3
-                
-                h0 = self.get_color(df.iloc[idx0])
-                h1 = self.get_color(df.iloc[idx1])
-                h2 = self.get_color(df.iloc[idx2])
-                h3 = self.get_color(df.iloc[idx3])
-                
-                if h0 == 0 or h1 == 0 or h2 == 0 or h3 == 0: continue
-
-                if (h3 != h2) and (h2 == h1) and (h1 == h0):
-                    current_pattern = 'AZUL'
-                    break 
-                
-                elif (h3 != h2) and (h2 == h1) and (h1 != h0) and (h0 == h3):
-                    current_pattern = 'ROSA'
-                    break 
+            cores = velas.cores
+            current_pattern = self._padrao_cacheado(ativo, velas)
 
             if current_pattern:
                 self.last_pattern[ativo] = current_pattern
             
             padrao_atual = self.last_pattern.get(ativo, 'WAIT')
             
-            c3 = self.get_color(df.iloc[-1]) 
-            c2 = self.get_color(df.iloc[-2]) 
-            c1 = self.get_color(df.iloc[-3]) 
+            c3, c2, c1 = int(cores[-1]), int(cores[-2]), int(cores[-3])
 
             if (c1 != c2) and (c2 == c3) and c1 != 0 and c2 != 0:
                 now = time.time()
@@ -574,18 +700,18 @@ class StrategyFalsa:
         self.api = api
         self.logger = logger
         self.nome = "Falsa"
+        self.lookback = 10
         self.ultima_direcao = {}
         self.contador = {}
         self.last_signal_time = {}
 
-    def analisar(self, ativo, tf_segundos):
+    def analisar(self, ativo, tf_segundos, candles=None):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 10, time.time())
-            if not candles or len(candles) < 5:
+            velas = obter_velas(self.api, ativo, tf_segundos, self.lookback, candles)
+            if not velas or len(velas) < 5:
                 return None, "WAIT"
             
-            ultimas = candles[-3:]
-            verdes = sum(1 for c in ultimas if c['close'] > c['open'])
+            verdes = int(np.count_nonzero(velas.close[-3:] > velas.open[-3:]))
             vermelhas = 3 - verdes
             
             if ativo not in self.contador:
@@ -635,36 +761,26 @@ class StrategyTrendPullback:
         self.api = api
         self.logger = logger
         self.nome = "TrendPullback"
+        self.lookback = 100
         self.last_signal_time = {}
-        
-    @staticmethod
-    def _ema(values, period: int):
-        if values is None or len(values) < period:
-            return None
-        values = np.asarray(values, dtype=float)
-        alpha = 2.0 / (period + 1.0)
-        ema = [values[0]]
-        for v in values[1:]:
-            ema.append((v - ema[-1]) * alpha + ema[-1])
-        return np.asarray(ema, dtype=float)
-
-    def analisar(self, ativo, tf_segundos):
+        # EMA21/EMA50 incrementais por ativo (O(1) por vela nova)
+        self.indicators = IndicatorEngine(ema_periods=(21, 50), atr_period=0)
+
+    def analisar(self, ativo, tf_segundos, candles=None):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 100, time.time())
-            if not candles or len(candles) < 60:
+            velas = obter_velas(self.api, ativo, tf_segundos, self.lookback, candles)
+            if not velas or len(velas) < 60:
                 return None, "WAIT"
             
-            closes = [float(c['close']) for c in candles]
-            
-            ema21 = self._ema(closes, 21)
-            ema50 = self._ema(closes, 50)
+            closes = velas.close[-3:].tolist()
             
-            if ema21 is None or ema50 is None or len(ema21) < 5 or len(ema50) < 5:
+            ind = self.indicators.update(ativo, tf_segundos, velas.candles)
+            if ind is None or ind['ema'][21] is None or ind['ema'][50] is None:
                 return None, "EMA_ERR"
             
             c0, c1, c2 = closes[-1], closes[-2], closes[-3]
-            e21 = float(ema21[-1])
-            e50 = float(ema50[-1])
+            e21 = float(ind['ema'][21])
+            e50 = float(ind['ema'][50])
             
             trend_up = e21 > e50
             trend_dn = e21 < e50
@@ -706,54 +822,81 @@ class StrategyTrendPullback:
 # SELETOR DE ATIVOS INTELIGENTE
 # =========================================
 class AtivoSelector:
-    def __init__(self, api, logger, performance_tracker):
+    def __init__(self, api, logger, performance_tracker, universe=None, get_candles=None, max_workers=8):
         self.api = api
         self.logger = logger
         self.performance = performance_tracker
+        self.universe = universe
+        self.get_candles = get_candles or (lambda ativo, tf, n: api.get_candles(ativo, tf, n, time.time()))
+        self.max_workers = max(1, int(max_workers))
         self.last_scan = 0
         self.ativos_prioritarios = ATIVOS_PRIORITARIOS
         
-    def get_color(self, candle):
-        if candle['close'] > candle['open']: return 1
-        if candle['close'] < candle['open']: return -1
-        return 0
-    
+    @staticmethod
+    def scores_tendencia(frames):
+        """
+        Score de tendência (0..100) de vários ativos de uma vez:
+        força = |média 5 - média 20| / média 20 * 100; sequência = maior série de
+        cores iguais nas últimas 10 velas; score = força * 2 + sequência * 5.
+        Ativos com menos de 20 velas ficam com 0.
+        """
+        scores = np.zeros(len(frames))
+        ok = [i for i, f in enumerate(frames) if f is not None and len(f) >= 20]
+        if not ok:
+            return scores
+
+        closes = np.vstack([frames[i].close[-20:] for i in ok])
+        cores = np.vstack([frames[i].cores[-10:] for i in ok])
+
+        media_curta = closes[:, -5:].mean(axis=1)
+        media_longa = closes.mean(axis=1)
+        forca = np.abs(media_curta - media_longa) / media_longa * 100
+
+        iguais = (cores[:, 1:] == cores[:, :-1]) & (cores[:, 1:] != 0)
+        seq = np.ones(len(ok))
+        seq_max = np.ones(len(ok))
+        for k in range(iguais.shape[1]):
+            seq = np.where(iguais[:, k], seq + 1, 1)
+            seq_max = np.maximum(seq_max, seq)
+
+        scores[ok] = np.minimum(100, forca * 2 + seq_max * 5)
+        return scores
+
+    def _velas(self, ativo, tf_segundos):
+        candles = self.get_candles(ativo, tf_segundos, 30)
+        return CandleFrame(candles) if candles else None
+
     def avaliar_tendencia(self, ativo, tf_segundos=60):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 30, time.time())
-            if not candles or len(candles) < 20:
-                return 0
-            
-            closes = [float(c['close']) for c in candles]
-            
-            media_curta = np.mean(closes[-5:])
-            media_longa = np.mean(closes[-20:])
-            
-            if media_curta > media_longa:
-                forca = (media_curta - media_longa) / media_longa * 100
-            else:
-                forca = (media_longa - media_curta) / media_longa * 100
-            
-            ultimas_cores = [self.get_color(c) for c in candles[-10:]]
-            sequencia_max = 1
-            seq_atual = 1
-            
-            for i in range(1, len(ultimas_cores)):
-                if ultimas_cores[i] == ultimas_cores[i-1] and ultimas_cores[i] != 0:
-                    seq_atual += 1
-                    sequencia_max = max(sequencia_max, seq_atual)
-                else:
-                    seq_atual = 1
-            
-            score = forca * 2 + sequencia_max * 5
-            return min(100, score)
-            
+            return float(self.scores_tendencia([self._velas(ativo, tf_segundos)])[0])
         except Exception as e:
             self.logger.log(f"Erro avaliar tendência {ativo}: {e}", 'error')
             return 0
+
+    def _scan_tendencia(self, ativos, tf_segundos, alvo, minimo=30):
+        """
+        Busca em ondas de max_workers ativos em paralelo; para assim que houver
+        alvo ativos com score acima do mínimo.
+        """
+        encontrados = []
+        for i in range(0, len(ativos), self.max_workers):
+            onda = ativos[i:i + self.max_workers]
+            velas, _ = fetch_many(lambda a: self._velas(a, tf_segundos), onda,
+                                  max_workers=self.max_workers, item_timeout=5.0)
+            nomes = [a for a in onda if velas.get(a) is not None]
+            scores = self.scores_tendencia([velas[a] for a in nomes])
+            encontrados.extend((a, float(sc)) for a, sc in zip(nomes, scores) if sc > minimo)
+            if len(encontrados) >= alvo:
+                break
+        return encontrados
     
     def get_todos_ativos_disponiveis(self, is_otc=True):
         try:
+            if self.universe is not None:
+                ativos = self.universe.assets(include_otc=is_otc, include_non_otc=not is_otc)
+                if ativos:
+                    return ativos
+            
             todos_ativos = self.api.get_all_open_time()
             ativos = []
             
@@ -797,13 +940,7 @@ class AtivoSelector:
         if restantes > 0:
             disponiveis = [a for a in lista_ativos if a not in selecionados]
             
-            scores_tendencia = []
-            for ativo in disponiveis[:30]:
-                score = self.avaliar_tendencia(ativo, tf_segundos)
-                if score > 30:
-                    scores_tendencia.append((ativo, score))
-                time.sleep(0.1)
-            
+            scores_tendencia = self._scan_tendencia(disponiveis[:30], tf_segundos, restantes * 2)
             scores_tendencia.sort(key=lambda x: x[1], reverse=True)
             melhores_tendencia = [a for a, s in scores_tendencia[:restantes * 2]]
             
@@ -831,7 +968,15 @@ class FrancisXDashboard:
         self.logger = None
         self.terminal_queue = queue.Queue()
         self.selector = None
-        self.performance = PerformanceTracker()
+        self.diario = TradeJournal()
+        self.performance = PerformanceTracker(diario=self.diario)
+        self.clock = ClockSync()
+        self.mercados = None
+        self.universe = None
+        # seletor, estratégias e settler buscam velas pela mesma api (ver _get_candles)
+        self._api_sem = threading.BoundedSemaphore(1)
+        self.settler = None
+        self._resultado_lock = threading.Lock()
         self.estrategias = {}
         
         self.saldo_inicial = 0
@@ -888,11 +1033,7 @@ class FrancisXDashboard:
         if hasattr(self, 'melhores_ativos'):
             ativos_atuais = self.melhores_ativos
         
-        dados = self.performance.get_tabela_dados(ativos_atuais if ativos_atuais else None)
-        
-        valores_tabela = []
-        for row in dados[:15]:
-            valores_tabela.append(row)
+        valores_tabela = self.performance.get_tabela_dados(ativos_atuais if ativos_atuais else None, limite=15)
         
         self.window['-TABLE-'].update(values=valores_tabela)
 
@@ -1250,50 +1391,40 @@ class FrancisXDashboard:
         if self.logger:
             self.logger.log(msg, level)
 
-    def verificar_resultado(self, ativo, direcao, stake, payout, timestamp_entrada):
-        self.log("Aguardando fechamento (62s)...", 'info')
-        
-        for i in range(62):
-            time.sleep(1)
-            if i % 10 == 0 and not self.api.check_connect():
-                self.api.connect()
+    def _on_resultado(self, entrada, resultado, lucro):
+        """
+        Chamado pelo TradeSettler (thread dele) quando a entrada liquida: atualiza
+        o estado aqui e pede o redesenho ao thread da GUI (-RESULTADO-).
+        """
+        nome = entrada.contexto.get('estrategia')
+        estrategia = entrada.contexto.get('obj')
 
-        self.log("Buscando resultado...", 'info')
+        if resultado == 'win':
+            self.log(f"{entrada.ativo} WIN +R${lucro:.2f}", 'win')
+        elif resultado == 'loss':
+            self.log(f"{entrada.ativo} LOSS -R${abs(lucro):.2f}", 'loss')
+        else:
+            self.log(f"{entrada.ativo} DOJI - Stake devolvido", 'warn')
+
+        with self._resultado_lock:
+            self.lucro_sessao += lucro
+            self.gerenciamento.atualizar_resultado(resultado, lucro)
+            self.performance.registrar_resultado(
+                entrada.ativo, nome, resultado,
+                direction=entrada.direcao, profit=lucro, stake=entrada.stake,
+                payout=entrada.payout, order_id=entrada.order_id, timeframe=entrada.tf,
+            )
 
-        for tentativa in range(3):
-            try:
-                velas = self.api.get_candles(ativo, 60, 3, time.time())
-                vela_certa = next((v for v in velas if v['from'] == timestamp_entrada), None)
-                
-                if vela_certa:
-                    abertura = float(vela_certa['open'])
-                    fechamento = float(vela_certa['close'])
-                    
-                    if fechamento > abertura:
-                        if direcao.upper() == 'CALL':
-                            lucro = round(stake * payout, 2)
-                            self.log(f"WIN +R${lucro:.2f}", 'win')
-                            return 'win', lucro
-                        else:
-                            self.log(f"LOSS -R${stake:.2f}", 'loss')
-                            return 'loss', -stake
-                    elif fechamento < abertura:
-                        if direcao.upper() == 'PUT':
-                            lucro = round(stake * payout, 2)
-                            self.log(f"WIN +R${lucro:.2f}", 'win')
-                            return 'win', lucro
-                        else:
-                            self.log(f"LOSS -R${stake:.2f}", 'loss')
-                            return 'loss', -stake
-                    else:
-                        self.log("DOJI - Stake devolvido", 'warn')
-                        return 'doji', 0.0
-                
-                time.sleep(1)
-            except Exception as e:
-                self.log(f"Erro: {e}", 'error')
-        
-        return 'loss', -stake
+            stats = self.gerenciamento.get_stats()
+            self.wins = stats['wins']
+            self.losses = stats['losses']
+            self.dojis = stats['dojis']
+
+        if self.window:
+            self.window.write_event_value('-RESULTADO-', None)
+
+        if nome == 'Falsa' and hasattr(estrategia, 'registrar_resultado'):
+            estrategia.registrar_resultado(entrada.ativo, entrada.direcao, resultado)
 
     def scan_ativos(self, values):
         if not self.api:
@@ -1301,7 +1432,8 @@ class FrancisXDashboard:
             return
         
         if not self.selector:
-            self.selector = AtivoSelector(self.api, self.logger, self.performance)
+            self.selector = AtivoSelector(self.api, self.logger, self.performance, self.universe,
+                                          get_candles=self._get_candles)
         
         self.log("Iniciando scan de ativos (prioritários + tendência)...", 'system')
         
@@ -1339,6 +1471,26 @@ class FrancisXDashboard:
             self.melhores_ativos = [f"{p}-OTC" if is_otc else p for p in ATIVOS_PRIORITARIOS[:qtd]]
             self.window['-ATIVOS_ATIVOS-'].update(', '.join(self.melhores_ativos[:3]))
 
+    def _get_candles(self, ativo, tf, quantidade):
+        """get_candles serializado: a resposta da api cai num slot único por chamada."""
+        with self._api_sem:
+            return self.api.get_candles(ativo, tf, quantidade, time.time())
+
+    def _snapshot_velas(self, ativos, tf, lookback):
+        """
+        Uma busca por ativo por ciclo (maior lookback entre as estratégias),
+        em paralelo entre ativos; todas as estratégias recebem o mesmo CandleFrame.
+        """
+        def buscar(ativo):
+            brutas = self._get_candles(ativo, tf, lookback)
+            return CandleFrame(brutas) if brutas else None
+
+        resultados, atrasados = fetch_many(buscar, ativos, max_workers=min(8, len(ativos) or 1),
+                                           item_timeout=10.0)
+        if atrasados:
+            self.log(f"Sem velas neste ciclo: {', '.join(atrasados)}", 'warn')
+        return {a: v for a, v in resultados.items() if v is not None}
+
     def executar_ciclo(self, values):
         try:
             stake_base = float(values['-VALOR-'].replace(',', '.'))
@@ -1393,7 +1545,18 @@ class FrancisXDashboard:
             )
             
             if not self.selector:
-                self.selector = AtivoSelector(self.api, self.logger, self.performance)
+                self.selector = AtivoSelector(self.api, self.logger, self.performance, self.universe,
+                                              get_candles=self._get_candles)
+            
+            # um settler por conexão, reaproveitado entre reinícios: entradas abertas
+            # de um ciclo anterior continuam sendo liquidadas
+            if self.settler is None or self.settler.api is not self.api:
+                if self.settler:
+                    self.settler.stop(drain=True)
+                self.settler = TradeSettler(self.api, self._on_resultado,
+                                            get_candles=self._get_candles, clock=self.clock)
+            # disparo 2s antes de cada fechamento (hora do servidor)
+            timer = CandleTimer(self.clock, lead_sec=2.0)
             
             self.log("="*50, 'system')
             self.log(f"ROBO INICIADO - {len(ativos_para_operar)} ativos", 'signal')
@@ -1420,12 +1583,13 @@ class FrancisXDashboard:
                     ativos_para_operar = getattr(self, 'melhores_ativos', ativos_para_operar)[:qtd_ativos]
                     ultimo_scan = time.time()
 
-                now = time.time()
-                segundos = time.localtime(now).tm_sec
-
-                if segundos not in [58, 59, 0]:
-                    time.sleep(0.5)
-                    continue
+                # dorme até o gatilho da próxima vela (sem polling de tm_sec)
+                proxima_vela = timer.wait_next(tf, lambda: self.is_running)
+                if proxima_vela is None:
+                    break
+                if timer.disparos % 30 == 0:
+                    st = timer.stats()
+                    self.log(f"Timer: jitter médio {st['jitter_ms']:.1f}ms | máx {st['jitter_max_ms']:.1f}ms", 'info')
 
                 if not self.api.check_connect():
                     self.log("Reconectando...", 'warn')
@@ -1433,19 +1597,27 @@ class FrancisXDashboard:
                     time.sleep(2)
                     continue
 
+                lookback = max(e.lookback for e in estrategias.values())
+                snapshot = self._snapshot_velas(ativos_para_operar, tf, lookback)
+
                 for ativo in ativos_para_operar:
                     if not self.is_running:
                         break
 
+                    velas = snapshot.get(ativo)
+                    if velas is None or self.settler.pendente(ativo):
+                        continue
+
                     for nome, estrategia in estrategias.items():
                         if not self.is_running:
                             break
 
                         try:
-                            direcao, motivo = estrategia.analisar(ativo, tf)
+                            direcao, motivo = estrategia.analisar(ativo, tf, velas)
 
                             if direcao in ['call', 'put']:
-                                stake = self.gerenciamento.calcular_stake()
+                                with self._resultado_lock:
+                                    stake = self.gerenciamento.calcular_stake()
                                 
                                 try:
                                     payout_info = self.api.get_all_profit()
@@ -1459,36 +1631,23 @@ class FrancisXDashboard:
                                 self.log(f"{'='*40}", 'signal')
                                 self.log(f"{ativo} | {direcao.upper()} | R${stake:.2f} | {nome} | {motivo}", 'signal')
                                 
+                                t0 = time.time()
                                 status, id_ordem = self.api.buy(stake, ativo, direcao, 1)
+                                self.clock.record_rtt(time.time() - t0)
 
                                 if status:
-                                    proxima_vela = int(now / 60) * 60 + 60
-                                    resultado, lucro = self.verificar_resultado(
-                                        ativo, direcao, stake, payout, proxima_vela
+                                    self.settler.submit(
+                                        id_ordem, ativo, direcao, stake, payout, proxima_vela, 60,
+                                        {'estrategia': nome, 'obj': estrategia}
                                     )
-                                    
-                                    self.lucro_sessao += lucro
-                                    self.gerenciamento.atualizar_resultado(resultado, lucro)
-                                    
-                                    self.performance.registrar_resultado(ativo, nome, resultado)
-                                    
-                                    stats = self.gerenciamento.get_stats()
-                                    self.wins = stats['wins']
-                                    self.losses = stats['losses']
-                                    self.dojis = stats['dojis']
-                                    
-                                    self._atualizar_dashboard()
-                                    
-                                    if nome == 'Falsa' and hasattr(estrategia, 'registrar_resultado'):
-                                        estrategia.registrar_resultado(ativo, direcao, resultado)
+                                    # uma entrada por ativo até liquidar
+                                    break
                                 else:
                                     self.log(f"Erro na compra {ativo}: {id_ordem}", 'error')
                         except Exception as e:
                             self.log(f"Erro em {ativo}/{nome}: {e}", 'error')
                             continue
 
-                time.sleep(1)
-
         except Exception as e:
             self.log(f"Erro fatal: {e}", 'error')
             self.is_running = False
@@ -1508,6 +1667,9 @@ class FrancisXDashboard:
             if event in (sg.WIN_CLOSED, 'SAIR'):
                 break
 
+            if event == '-RESULTADO-':
+                self._atualizar_dashboard()
+
             if event == '-LIMPAR_LOG-':
                 self.window['-REGISTRO-'].update('')
 
@@ -1538,6 +1700,14 @@ class FrancisXDashboard:
                     
                     if status:
                         self.api.change_balance(tipo)
+                        self.clock.stop()
+                        self.clock = ClockSync(self.api)
+                        self.clock.start()
+                        if self.mercados:
+                            self.mercados.stop()
+                        self.mercados = OpenMarketsSnapshot(self.api.get_all_open_time, ttl_sec=60)
+                        self.universe = AssetUniverse(self.mercados)
+                        self.mercados.start()
                         self.saldo_inicial = self.api.get_balance()
                         
                         self.window['-STATUS-'].update('CONECTADO')
@@ -1548,8 +1718,10 @@ class FrancisXDashboard:
                         self.window['-SCAN_ATIVOS-'].update(disabled=False)
                         
                         is_otc = values['-IS_OTC-']
-                        temp_selector = AtivoSelector(self.api, self.logger, self.performance)
-                        self.todos_ativos = temp_selector.get_todos_ativos_disponiveis(is_otc)
+                        # conexão nova: o seletor passa a usar a api e o universo novos
+                        self.selector = AtivoSelector(self.api, self.logger, self.performance, self.universe,
+                                                      get_candles=self._get_candles)
+                        self.todos_ativos = self.selector.get_todos_ativos_disponiveis(is_otc)
                         self.window['-ATIVO-'].update(values=['AUTO-SCAN'] + self.todos_ativos)
                         
                         self._atualizar_dashboard()
@@ -1594,6 +1766,7 @@ class FrancisXDashboard:
 
         if self.logger:
             self.logger.stop()
+        self.diario.close()
         self.window.close()
 
 
@@ -8,11 +8,15 @@ import sys
 from iqoptionapi.stable_api import IQ_Option
 from collections import defaultdict
 from datetime import datetime
-import pandas as pd
+import numpy as np
 import math
 from typing import Optional, Dict, List
 import queue
 
+from candle_timer import CandleTimer
+from clock_sync import ClockSync
+from settlement import TradeSettler
+
 # Configurar encoding para Windows
 if sys.platform.startswith("win"):
     try:
@@ -220,54 +224,70 @@ class SorosGale:
 # ESTRATÉGIA DE CICLOS PROBABILÍSTICOS
 # =========================================
 class StrategyCiclos:
-    def __init__(self, api, logger):
+    def __init__(self, api, logger, get_candles=None):
         self.api = api
         self.logger = logger
+        self.get_candles = get_candles or (lambda ativo, tf, n: api.get_candles(ativo, tf, n, time.time()))
         self.nome = "Ciclos"
         self.last_found_patterns = {}
-
-    def get_color(self, candle):
-        if candle['close'] > candle['open']: 
-            return 1  # Verde
-        if candle['close'] < candle['open']: 
-            return -1  # Vermelha
-        return 0  # Doji
+        self._padrao_cache = {}
+
+    @staticmethod
+    def cores(candles):
+        """Cores das velas como int8: 1 verde, -1 vermelha, 0 doji."""
+        n = len(candles)
+        opens = np.fromiter((c['open'] for c in candles), dtype=float, count=n)
+        closes = np.fromiter((c['close'] for c in candles), dtype=float, count=n)
+        return np.sign(closes - opens).astype(np.int8)
+
+    @staticmethod
+    def buscar_padrao(cores):
+        """
+        Padrão AZUL/ROSA mais recente entre as velas fechadas (a última é a ao vivo).
+        Mesma busca do laço antigo (i = 2..min(n-5, 100)), feita com views deslocadas.
+        """
+        n = len(cores)
+        limite = min(n - 5, 100)
+        if limite <= 2:
+            return None
+        lo, hi = n - limite + 1, n - 1
+        h0 = cores[lo:hi]
+        h1 = cores[lo - 1:hi - 1]
+        h2 = cores[lo - 2:hi - 2]
+        h3 = cores[lo - 3:hi - 3]
+
+        base = (h0 != 0) & (h1 != 0) & (h2 != 0) & (h3 != 0) & (h3 != h2) & (h2 == h1)
+        azul = base & (h1 == h0)
+        rosa = base & (h1 != h0) & (h0 == h3)
+        achados = np.flatnonzero(azul | rosa)
+        if not achados.size:
+            return None
+        # o laço começava pela vela mais recente: o último achado vence
+        return 'AZUL' if azul[achados[-1]] else 'ROSA'
+
+    def _padrao_cacheado(self, ativo, candles, cores):
+        # a busca só olha velas fechadas: muda apenas quando abre uma vela nova
+        chave = candles[-1].get('from')
+        cache = self._padrao_cache.get(ativo)
+        if cache is not None and chave is not None and cache[0] == chave:
+            return cache[1]
+        padrao = self.buscar_padrao(cores)
+        self._padrao_cache[ativo] = (chave, padrao)
+        return padrao
 
     def analisar(self, ativo, tf_segundos):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 120, time.time())
+            candles = self.get_candles(ativo, tf_segundos, 120)
             if not candles or len(candles) < 20:
                 return None, "Aguardando dados"
             
-            df = pd.DataFrame(candles)
             asset_name = ativo
             
             last_found_pattern = self.last_found_patterns.get(asset_name)
 
             # Identificar padrão (AZUL ou ROSA)
-            current_pattern = None
-            lookback_limit = min(len(df) - 5, 100)
-            
-            for i in range(2, lookback_limit): 
-                idx0, idx1, idx2, idx3 = -i, -i-1, -i-2, -i-3
-                
-                h0 = self.get_color(df.iloc[idx0])
-                h1 = self.get_color(df.iloc[idx1])
-                h2 = self.get_color(df.iloc[idx2])
-                h3 = self.get_color(df.iloc[idx3])
-                
-                if h0 == 0 or h1 == 0 or h2 == 0 or h3 == 0: 
-                    continue
-
-                # AZUL
-                if (h3 != h2) and (h2 == h1) and (h1 == h0):
-                    current_pattern = 'AZUL'
-                    break 
-                
-                # ROSA
-                elif (h3 != h2) and (h2 == h1) and (h1 != h0) and (h0 == h3):
-                    current_pattern = 'ROSA'
-                    break 
+            cores = self.cores(candles)
+            current_pattern = self._padrao_cacheado(ativo, candles, cores)
 
             padrao_ativo = current_pattern
             
@@ -281,9 +301,7 @@ class StrategyCiclos:
                 return None, "⏳"
 
             # Gatilho de entrada
-            c3 = self.get_color(df.iloc[-1]) 
-            c2 = self.get_color(df.iloc[-2]) 
-            c1 = self.get_color(df.iloc[-3]) 
+            c3, c2, c1 = int(cores[-1]), int(cores[-2]), int(cores[-3])
 
             gatilho_pronto = (c1 != c2) and (c2 == c3) and c1 != 0 and c2 != 0
 
@@ -308,9 +326,10 @@ class StrategyCiclos:
 # ESTRATÉGIA FALSA ENTRADA
 # =========================================
 class StrategyFalsa:
-    def __init__(self, api, logger):
+    def __init__(self, api, logger, get_candles=None):
         self.api = api
         self.logger = logger
+        self.get_candles = get_candles or (lambda ativo, tf, n: api.get_candles(ativo, tf, n, time.time()))
         self.nome = "Falsa"
         self.historico_entradas = {}
         self.contador_reversao = {}
@@ -328,7 +347,7 @@ class StrategyFalsa:
     
     def analisar(self, ativo, tf_segundos):
         try:
-            candles = self.api.get_candles(ativo, tf_segundos, 30, time.time())
+            candles = self.get_candles(ativo, tf_segundos, 30)
             if not candles or len(candles) < 20:
                 return None, "Dados"
             
@@ -415,6 +434,11 @@ class ProBotDashboard:
         self.is_running = False
         self.logger = None
         self.gerenciamento = None
+        self.clock = ClockSync()
+        self._api_sem = threading.BoundedSemaphore(1)
+        self.settler = None
+        self._resultado_lock = threading.Lock()
+        self.lucro_acumulado = 0.0
         
         # Dados de mercado
         self.mercado_info = {
@@ -641,6 +665,9 @@ class ProBotDashboard:
 
         if status:
             self.api.change_balance(tipo_conta)
+            self.clock.stop()
+            self.clock = ClockSync(self.api)
+            self.clock.start()
             self.mercado_info['conectado'] = True
             self.mercado_info['tipo_conta'] = tipo_conta
             
@@ -673,50 +700,50 @@ class ProBotDashboard:
         if self.logger:
             self.logger.log(msg, level)
 
-    def verificar_resultado(self, ativo, direcao, stake, payout, timestamp_entrada):
-        self.log("⏳ Aguardando fechamento da vela (62s)...", 'info')
-        
-        for i in range(62):
-            time.sleep(1)
-            if i % 10 == 0 and not self.api.check_connect():
-                self.api.connect()
-
-        self.log("📊 Buscando resultado...", 'info')
+    def _get_candles(self, ativo, tf, quantidade):
+        # estratégias e settler dividem a api: uma busca de velas por vez
+        with self._api_sem:
+            return self.api.get_candles(ativo, tf, quantidade, time.time())
 
-        for tentativa in range(3):
-            try:
-                velas = self.api.get_candles(ativo, 60, 3, time.time())
-                vela_certa = next((v for v in velas if v['from'] == timestamp_entrada), None)
-                
-                if vela_certa:
-                    abertura = float(vela_certa['open'])
-                    fechamento = float(vela_certa['close'])
-                    
-                    if fechamento > abertura:  # CALL
-                        if direcao.upper() == 'CALL':
-                            lucro = round(stake * payout, 2)
-                            self.log(f"💰 WIN! +R${lucro:.2f}", 'win')
-                            return 'win', lucro
-                        else:
-                            self.log(f"📉 LOSS -R${stake:.2f}", 'loss')
-                            return 'loss', -stake
-                    elif fechamento < abertura:  # PUT
-                        if direcao.upper() == 'PUT':
-                            lucro = round(stake * payout, 2)
-                            self.log(f"💰 WIN! +R${lucro:.2f}", 'win')
-                            return 'win', lucro
-                        else:
-                            self.log(f"📉 LOSS -R${stake:.2f}", 'loss')
-                            return 'loss', -stake
-                    else:  # DOJI
-                        self.log("⚖️ DOJI - Stake devolvido", 'warn')
-                        return 'doji', 0.0
-                
-                time.sleep(1)
-            except Exception as e:
-                self.log(f"Erro na verificação: {e}", 'error')
+    def _on_resultado(self, entrada, resultado, lucro):
+        """
+        Chamado pelo TradeSettler (thread dele) quando a entrada liquida: atualiza
+        o estado aqui e manda o placar para o thread da GUI (-RESULTADO-).
+        """
+        if resultado == 'win':
+            self.log(f"💰 WIN! +R${lucro:.2f}", 'win')
+        elif resultado == 'loss':
+            self.log(f"📉 LOSS -R${abs(lucro):.2f}", 'loss')
+        else:
+            self.log("⚖️ DOJI - Stake devolvido", 'warn')
+
+        with self._resultado_lock:
+            self.lucro_acumulado += lucro
+            self.gerenciamento.atualizar_resultado(resultado, lucro)
+            stats = self.gerenciamento.get_stats()
+            lucro_acumulado = self.lucro_acumulado
+
+        # Registrar na estratégia falsa
+        estrategia = entrada.contexto.get('obj')
+        if entrada.contexto.get('estrategia') == 'Falsa':
+            estrategia.registrar_resultado(entrada.ativo, entrada.direcao, resultado)
+
+        self.window.write_event_value('-RESULTADO-', (stats, lucro_acumulado))
+
+    def _atualizar_placar(self, stats, lucro_acumulado):
+        # Atualizar contadores
+        self.window['-PLACAR-'].update(f"{stats['wins']}W - {stats['losses']}L - {stats['dojis']}D")
+        self.window['-WIN_RATE-'].update(f"{stats['win_rate']:.1f}%")
+        self.window['-SEQUENCIA-'].update(str(stats['sequencia']))
+        self.window['-TOTAL_TRADES-'].update(str(stats['total']))
+        self.window['-LUCRO-'].update(self._format_brl(lucro_acumulado))
+        
+        # Cor do lucro
+        cor = self.palette['SUCCESS'] if lucro_acumulado >= 0 else self.palette['ERROR']
+        self.window['-LUCRO-'].update(text_color=cor)
         
-        return 'loss', -stake
+        # Atualizar saldo
+        self.atualizar_saldo()
 
     def executar_ciclo(self, values):
         """Loop principal de trading"""
@@ -739,9 +766,9 @@ class ProBotDashboard:
             # Estratégias
             estrategias = {}
             if self.window['-ESTR_CICLOS-'].get():
-                estrategias['Ciclos'] = StrategyCiclos(self.api, self.logger)
+                estrategias['Ciclos'] = StrategyCiclos(self.api, self.logger, self._get_candles)
             if self.window['-ESTR_FALSA-'].get():
-                estrategias['Falsa'] = StrategyFalsa(self.api, self.logger)
+                estrategias['Falsa'] = StrategyFalsa(self.api, self.logger, self._get_candles)
 
             if not estrategias:
                 self.log("❌ Nenhuma estratégia ativa!", 'error')
@@ -761,28 +788,35 @@ class ProBotDashboard:
             self.log(f"📊 Meta: +R${stop_win:.2f} | Stop: -R${stop_loss:.2f}", 'info')
             self.log(f"{'='*50}\n", 'info')
 
-            lucro_acumulado = 0.0
+            self.lucro_acumulado = 0.0
+            # troca de api: o settler antigo termina de liquidar o que abriu
+            if self.settler is None or self.settler.api is not self.api:
+                if self.settler:
+                    self.settler.stop(drain=True)
+                self.settler = TradeSettler(self.api, self._on_resultado,
+                                            get_candles=self._get_candles, clock=self.clock)
+            # disparo 2s antes de cada fechamento (hora do servidor)
+            timer = CandleTimer(self.clock, lead_sec=2.0)
 
             while self.is_running:
                 # Verificar stops
-                if lucro_acumulado >= stop_win:
-                    self.log(f"\n🏆 META BATIDA! Lucro: R${lucro_acumulado:.2f}", 'win')
+                if self.lucro_acumulado >= stop_win:
+                    self.log(f"\n🏆 META BATIDA! Lucro: R${self.lucro_acumulado:.2f}", 'win')
                     self.is_running = False
                     break
 
-                if lucro_acumulado <= -stop_loss:
-                    self.log(f"\n🛑 STOP LOSS ATINGIDO! Prejuízo: R${lucro_acumulado:.2f}", 'loss')
+                if self.lucro_acumulado <= -stop_loss:
+                    self.log(f"\n🛑 STOP LOSS ATINGIDO! Prejuízo: R${self.lucro_acumulado:.2f}", 'loss')
                     self.is_running = False
                     break
 
-                # Sincronizar com o tempo
-                now = time.time()
-                segundos = time.localtime(now).tm_sec
-                proxima_vela = int(now / 60) * 60 + 60
-
-                if segundos not in [58, 59, 0]:
-                    time.sleep(0.5)
-                    continue
+                # Dormir até o gatilho da próxima vela (relógio do servidor)
+                proxima_vela = timer.wait_next(tf, lambda: self.is_running)
+                if proxima_vela is None:
+                    break
+                if timer.disparos % 30 == 0:
+                    st = timer.stats()
+                    self.log(f"⏱️ Timer: jitter médio {st['jitter_ms']:.1f}ms | máx {st['jitter_max_ms']:.1f}ms", 'info')
 
                 # Verificar conexão
                 if not self.api.check_connect():
@@ -791,6 +825,10 @@ class ProBotDashboard:
                     time.sleep(2)
                     continue
 
+                # Entrada em aberto: espera liquidar antes de operar de novo o ativo
+                if self.settler.pendente(ativo):
+                    continue
+
                 # Analisar cada estratégia
                 for nome, estrategia in estrategias.items():
                     if not self.is_running:
@@ -800,8 +838,9 @@ class ProBotDashboard:
 
                     if direcao in ['call', 'put']:
                         # Calcular stake
-                        stake = self.gerenciamento.calcular_stake()
-                        info_entrada = self.gerenciamento.obter_info_entrada()
+                        with self._resultado_lock:
+                            stake = self.gerenciamento.calcular_stake()
+                            info_entrada = self.gerenciamento.obter_info_entrada()
                         
                         # Obter payout
                         try:
@@ -816,40 +855,19 @@ class ProBotDashboard:
                         self.log(f"🚀 SINAL: {direcao.upper()} | {info_entrada} | R${stake:.2f} | {motivo}", 'signal')
                         
                         # Executar compra
+                        t0 = time.time()
                         status, id_ordem = self.api.buy(stake, ativo, direcao, 1)
+                        self.clock.record_rtt(time.time() - t0)
 
                         if status:
-                            resultado, lucro = self.verificar_resultado(
-                                ativo, direcao, stake, payout, proxima_vela
+                            self.settler.submit(
+                                id_ordem, ativo, direcao, stake, payout, proxima_vela, 60,
+                                {'estrategia': nome, 'obj': estrategia}
                             )
-                            
-                            lucro_acumulado += lucro
-                            self.gerenciamento.atualizar_resultado(resultado, lucro)
-                            
-                            # Atualizar contadores
-                            stats = self.gerenciamento.get_stats()
-                            self.window['-PLACAR-'].update(f"{stats['wins']}W - {stats['losses']}L - {stats['dojis']}D")
-                            self.window['-WIN_RATE-'].update(f"{stats['win_rate']:.1f}%")
-                            self.window['-SEQUENCIA-'].update(str(stats['sequencia']))
-                            self.window['-TOTAL_TRADES-'].update(str(stats['total']))
-                            self.window['-LUCRO-'].update(self._format_brl(lucro_acumulado))
-                            
-                            # Cor do lucro
-                            cor = self.palette['SUCCESS'] if lucro_acumulado >= 0 else self.palette['ERROR']
-                            self.window['-LUCRO-'].update(text_color=cor)
-                            
-                            # Atualizar saldo
-                            self.atualizar_saldo()
-                            
-                            # Registrar na estratégia falsa
-                            if nome == 'Falsa':
-                                estrategia.registrar_resultado(ativo, direcao, resultado)
+                            break
                         else:
                             self.log(f"❌ Erro na compra: {id_ordem}", 'error')
 
-                # Pequena pausa
-                time.sleep(1)
-
         except Exception as e:
             self.log(f"❌ Erro crítico: {e}", 'error')
             self.is_running = False
@@ -874,6 +892,9 @@ class ProBotDashboard:
             if event in (sg.WIN_CLOSED, 'SAIR'):
                 break
 
+            if event == '-RESULTADO-':
+                self._atualizar_placar(*values[event])
+
             if event == '-LIMPAR_TERMINAL-':
                 self.window['-TERMINAL-'].update('')
 